@@ -0,0 +1,188 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+
+import gurobipy as gp
+import numpy as np
+
+import generator
+import grasp_solver as g
+import instance as i
+import mip_model_solver as mip
+import solution as s
+
+SIZES = [5, 10, 20, 40]  # customers per generated instance
+# metrics where higher is better (the others are seconds), with the count of the work they time in one run
+THROUGHPUT = {'distance_per_s': 'distance_calls', 'masked_per_s': 'masked_calls', 'extend_per_s': 'extend_calls',
+              'candidates_per_s': 'candidates_scored'}
+COUNTS = {'variables', 'constraints'} | set(THROUGHPUT.values())  # sizes, not timings
+OUTCOMES = {'solve_status', 'solve_gap', 'solve_to_build'}  # what the solve reached, not timings
+NOISE = 0.001  # seconds; slowdowns smaller than this are timer noise, not regressions
+GRASP_ITERATIONS = 3
+MIN_TIME = 0.05  # seconds; shorter calls are repeated within one run until they add up to this
+
+
+def timed(function, repeat):
+    # Median wall time of one call over several runs. Each run calls the function as often as needed to last
+    # MIN_TIME, so that fast calls (and the throughputs derived from them) are not at the mercy of the timer
+    runs = []
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            function()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= MIN_TIME:
+                break
+        runs.append(elapsed / calls)
+    return statistics.median(runs)
+
+
+def built(instance, matrix):
+    solver = mip.MIPSolver(instance)
+    solver.build(matrix, env=ENV)
+    return solver
+
+
+def phase(make, name, repeat):
+    # Median time of one phase, as recorded by the MIPSolver itself (see MIPSolver.timings), over fresh solvers
+    runs = []
+    for _ in range(repeat):
+        solver = make()
+        runs.append(solver.timings[name])
+        if solver.model is not None:
+            solver.model.dispose()
+    return statistics.median(runs)
+
+
+def bench_instance(filename, repeat, seed, time_limit):
+    results = dict()
+    with contextlib.redirect_stdout(io.StringIO()):  # Instance() reports every parse
+        results['parse'] = timed(lambda: i.Instance(filename, cache=False), repeat)
+        # the cache itself, whatever the file size (Instance() skips it below instance.CACHE_MIN_BYTES)
+        threshold, i.CACHE_MIN_BYTES = i.CACHE_MIN_BYTES, 0
+        try:
+            i.Instance(filename)  # leaves the binary cache behind
+            results['load_cached'] = timed(lambda: i.Instance(filename), repeat)
+        finally:
+            i.CACHE_MIN_BYTES = threshold
+        data = i.Instance(filename)
+
+    results['init_graph'] = phase(lambda: mip.MIPSolver(data), 'init_graph', repeat)
+    results['init_arcs'] = phase(lambda: mip.MIPSolver(data), 'init_arcs', repeat)
+
+    rng = random.Random(seed)
+    labels = list(data.index)
+    pairs = [(rng.choice(labels), rng.choice(labels)) for _ in range(100000)]
+    elapsed = timed(lambda: [data.distance(o, d) for (o, d) in pairs], repeat)
+    results['distance_per_s'] = len(pairs) / elapsed
+    results['distance_calls'] = len(pairs)
+
+    # extend() from the empty schedule: every (customer, time) pair over the windows, most of them feasible
+    empty = s.Solution(data)
+    actions = [(c, t) for c in sorted(data.customers) for t in range(data.earliest[c], data.latest[c] + 1, 5)]
+    elapsed = timed(lambda: [empty.masked(a) for a in actions], repeat)
+    results['masked_per_s'] = len(actions) / elapsed
+    results['masked_calls'] = len(actions)
+    elapsed = timed(lambda: [empty.extend(c, t, verbose=False) for (c, t) in actions], repeat)
+    results['extend_per_s'] = len(actions) / elapsed
+    results['extend_calls'] = len(actions)
+
+    # the same (customer, time) pairs scored for every vehicle in one candidates() call
+    grid = sorted({t for (c, t) in actions})
+    elapsed = timed(lambda: empty.candidates(grid), repeat)
+    results['candidates_scored'] = len(grid) * len(data.customers) * len(data.vehicles)
+    results['candidates_per_s'] = results['candidates_scored'] / elapsed
+
+    # a few GRASP iterations, construction and local search (apply/undo and the index behind them)
+    results['grasp'] = timed(lambda: g.ConstHeurSolver(data).solve(GRASP_ITERATIONS, seed=seed, verbose=False), repeat)
+
+    # model construction only; the graph and arcs are timed above
+    results['build_loops'] = phase(lambda: built(data, matrix=False), 'build', repeat)
+    results['build_matrix'] = phase(lambda: built(data, matrix=True), 'build', repeat)
+    solver = built(data, matrix=True)
+    results['variables'], results['constraints'] = solver.model.NumVars, solver.model.NumConstrs
+
+    # one solve, within the time limit; solve_to_build above 1 means the size is solve-bound, below 1 build-bound
+    result = solver.solve({'TimeLimit': time_limit, 'Seed': seed})
+    results['solve'] = solver.timings['optimize']
+    results['solve_status'] = result.status
+    results['solve_gap'] = result.gap  # None without an incumbent
+    results['solve_to_build'] = results['solve'] / (results['init_graph'] + results['init_arcs'] +
+                                                    results['build_matrix'])
+    solver.model.dispose()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Metrics worse than the baseline by more than the tolerance (a fraction), as printable lines. Throughputs are
+    # compared as the time their work takes, so that the same NOISE floor applies to every metric
+    regressions = []
+    for size, metrics in results.items():
+        for name, value in metrics.items():
+            old = baseline.get(size, {}).get(name)
+            if old is None or name in COUNTS or name in OUTCOMES:
+                continue
+            if name in THROUGHPUT:
+                work = metrics[THROUGHPUT[name]]
+                worse = work / value > work / old * (1 + tolerance) + NOISE
+            else:
+                worse = value > old * (1 + tolerance) + NOISE
+            if worse:
+                regressions.append(f'{size} customers, {name}: {value:.6g} (baseline {old:.6g})')
+    return regressions
+
+
+ENV = None  # quiet Gurobi environment shared by every model built here
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the build and solve phases of the CDP on generated instances')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='customers per instance')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement, the median is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--baseline', help='earlier output to compare against')
+    parser.add_argument('--time-limit', type=float, default=10, help='seconds for the solve of each instance')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before flagging')
+    args = parser.parse_args()
+
+    ENV = gp.Env(params={'OutputFlag': 0})
+    results = dict()
+    with tempfile.TemporaryDirectory() as folder:
+        for size in args.sizes:
+            filename = os.path.join(folder, f'G_{size}_{args.seed}.rmc')
+            generator.write(filename, size, max(2, size // 3), max(1, size // 10), args.seed + size)
+            results[str(size)] = bench_instance(filename, args.repeat, args.seed, args.time_limit)
+            print(f'{size} customers: ' + ', '.join(f'{name} {value:.4g}' for name, value in results[str(size)].items()
+                                                    if value is not None))
+
+    report = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'gurobi': '.'.join(str(n) for n in gp.gurobi.version()),
+        'machine': platform.platform(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'time_limit': args.time_limit,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Results written to {args.output}')
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for line in regressions:
+            print(f'Regression: {line}')
+        if regressions:
+            raise SystemExit(1)
+        print(f'No regression against {args.baseline}')
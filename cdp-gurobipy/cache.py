@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+
+import solution as s
+
+CACHE_FORMAT = 1  # bump whenever the entries or the fingerprints change, so stale entries are ignored
+FLEET = ('vehicles', 'capacity', 'serviceLength', 'stations', 'maxLag')  # what near matches share
+CUSTOMERS = ('customers', 'demand', 'earliest', 'latest', 'locations', 'coordinates')
+
+
+def fingerprint(data, names, params=None):
+    # Content hash of some of the parsed instance arrays (see instance.parse()), and of the solver parameters
+    h = hashlib.sha1(str(CACHE_FORMAT).encode())
+    for name in names:
+        array = data[name]
+        h.update(f'{name}:{array.dtype.str}:{array.shape}'.encode())
+        h.update(array.tobytes())
+    h.update(json.dumps(params or {}, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def replay(instance, actions):
+    # A Solution of instance from cached visits, keeping those that are still feasible (in order, so a visit
+    # dropped because its customer changed does not break the others). Meant as a MIP start
+    solution = s.Solution(instance)
+    for (v, c, start, departure) in actions:
+        if v not in solution.position or c not in instance.customers or solution.masked((c, start)):
+            continue
+        arrival = solution.times[v] + instance.distance(solution.position[v], c)
+        if arrival <= start and start + instance.serviceLength[v] <= instance.latest[c]:
+            solution.perform(v, c, start, record=False)
+    return solution
+
+
+class SolutionCache:
+    # Best known solution and bound per (instance, solver parameters), one JSON file each in a folder.
+    # Only the most recently used entries are kept (file modification times order them)
+    def __init__(self, folder, capacity=100):
+        self.folder = folder
+        self.capacity = capacity  # entries kept, the least recently used ones are evicted beyond that
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.folder, key + '.json')
+
+    def entries(self):  # entry files, least recently used first
+        paths = [os.path.join(self.folder, f) for f in os.listdir(self.folder) if f.endswith('.json')]
+        return sorted(paths, key=os.path.getmtime)
+
+    def read(self, path, touch=True):
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            if touch:
+                os.utime(path)  # most recently used
+        except (OSError, ValueError):
+            return None  # evicted meanwhile, or not an entry
+        return entry
+
+    def lookup(self, instance, params=None):
+        # (entry, exact): the entry of this very instance and parameters, or else the most recently used one of an
+        # instance with the same fleet and stations (only its solution is relevant then). (None, False) on a miss
+        path = self.path(fingerprint(instance.data, FLEET + CUSTOMERS, params))
+        if os.path.exists(path):
+            entry = self.read(path)
+            if entry is not None:
+                return entry, True
+        fleet = fingerprint(instance.data, FLEET)
+        for path in reversed(self.entries()):
+            entry = self.read(path, touch=False)
+            if entry is not None and entry['fleet'] == fleet:
+                return self.read(path) or entry, False
+        return None, False
+
+    def start(self, instance, entry):  # the cached solution as a MIP start for instance
+        return replay(instance, [tuple(a) for a in entry['actions']])
+
+    def save(self, instance, params, solver, result):
+        # Store the MIPResult of solver, with its visits, unless a better one is already cached
+        key = fingerprint(instance.data, FLEET + CUSTOMERS, params)
+        path = self.path(key)
+        if os.path.exists(path):
+            old = self.read(path)
+            if old is not None and old['objective'] is not None and \
+                    (result.objective is None or old['objective'] > result.objective):
+                return
+        entry = {
+            'fleet': fingerprint(instance.data, FLEET),
+            'params': params or {},
+            'status': result.status,
+            'objective': result.objective,
+            'bound': result.bound,
+            'gap': result.gap,
+            'actions': [[v, c, start, start + instance.serviceLength[v]]  # as in Solution.actions
+                        for start, v, c in (result.deliveries(solver) if result.objective is not None else [])],
+        }
+        partial = f'{path}.{os.getpid()}.tmp'  # write aside and rename, so concurrent runs never read a partial entry
+        with open(partial, 'w') as f:
+            json.dump(entry, f)
+        os.replace(partial, path)
+
+        for old in self.entries()[:-self.capacity]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass  # already evicted by another run
@@ -0,0 +1,120 @@
+import argparse
+import os
+
+import numpy as np
+
+# Generation parameters, as listed after the '-----' separator of the .rmc files (A_2_5_1.rmc uses these values)
+DEFAULTS = {
+    'minVehicleCap': 10,
+    'maxVehicleCap': 25,
+    'vehicleClasses': 3,  # distinct (capacity, service length) pairs in the fleet
+    'minCustDemand': 10,
+    'maxCustDemand': 75,
+    'timeWindowScaleFactor': 1.1,  # slack of a window over the time its deliveries take
+    'maxDistanceToNearestStation': 30,
+    'maxDistanceStationToDepot': 12,
+    'timeHorizon': 500,
+    'maxTimeLag': 5,
+    'gridSize': 100,  # coordinates lie in [0, gridSize]^2, the depot at the centre; smaller is denser
+}
+
+
+def around(rng, centres, count, radius):
+    # count integer points, each within radius of one of the centres picked at random (uniform over the disc)
+    centre = centres[rng.integers(len(centres), size=count)]
+    angle = rng.uniform(0, 2 * np.pi, count)
+    r = np.maximum(radius - 1, 0) * np.sqrt(rng.uniform(0, 1, count))  # 1 less, to stay within after rounding
+    return np.rint(centre + np.column_stack((r * np.cos(angle), r * np.sin(angle)))).astype(int)
+
+
+def generate(customers, vehicles, stations, seed=0, **params):
+    # Random instance arrays, laid out as instance.parse() returns them (without the travel times)
+    p = dict(DEFAULTS, **params)
+    rng = np.random.default_rng(seed)
+    grid = p['gridSize']
+    depot = np.array([[grid // 2, grid // 2]])
+
+    # Fleet: a few vehicle classes, service length equal to capacity (one ton unloaded per minute)
+    classes = rng.integers(p['minVehicleCap'], p['maxVehicleCap'] + 1, size=p['vehicleClasses'])
+    capacity = classes[rng.integers(len(classes), size=vehicles)]
+    service_length = capacity.copy()
+
+    # Stations near the depot, customers near some station
+    station_xy = np.clip(around(rng, depot, stations, p['maxDistanceStationToDepot']), 0, grid)
+    customer_xy = np.clip(around(rng, station_xy, customers, p['maxDistanceToNearestStation']), 0, grid)
+
+    # Windows open once a truck can get there (loading at the nearest station) and last as long as the deliveries
+    # of the smallest trucks take, stretched by the scale factor and a random slack
+    demand = rng.integers(p['minCustDemand'], p['maxCustDemand'] + 1, size=customers)
+    gap = np.sqrt(((station_xy[np.newaxis, :, :] - customer_xy[:, np.newaxis, :]) ** 2).sum(axis=2))
+    to_depot = np.sqrt(((station_xy - depot) ** 2).sum(axis=1))
+    reach = np.ceil((gap + to_depot[np.newaxis, :]).min(axis=1)).astype(int)
+    smallest = capacity.min()
+    width = np.ceil(p['timeWindowScaleFactor'] * np.ceil(demand / smallest) * smallest *
+                    rng.uniform(1, 2, customers)).astype(int)
+    width = np.minimum(width, p['timeHorizon'] - reach)
+    earliest = reach + np.floor(rng.uniform(0, 1, customers) * (p['timeHorizon'] - reach - width + 1)).astype(int)
+    latest = earliest + width
+
+    vehicle_labels = np.array([f'k{k}' for k in range(vehicles)])
+    customer_labels = np.array([f'c{c}' for c in range(customers)])
+    station_labels = np.array([f's{s}' for s in range(stations)])
+    return {
+        'vehicles': vehicle_labels,
+        'capacity': capacity,
+        'serviceLength': service_length,
+        'customers': customer_labels,
+        'demand': demand,
+        'earliest': earliest,
+        'latest': latest,
+        'stations': station_labels,
+        'locations': np.concatenate((['v0', 'v1'], station_labels, customer_labels)),
+        'coordinates': np.concatenate((depot, depot, station_xy, customer_xy)),
+        'maxLag': np.array(p['maxTimeLag']),
+    }
+
+
+def render(data, **params):
+    # The .rmc text of generated arrays, generation parameters included
+    p = dict(DEFAULTS, **params)
+    lines = [f"MaxTimeLag:\t{int(data['maxLag'])}", f"Vehicles:\t{len(data['vehicles'])}"]
+    lines += [f'{k}\t{cap}\t{sl}' for k, cap, sl in zip(data['vehicles'], data['capacity'], data['serviceLength'])]
+    lines.append(f"Customers:\t{len(data['customers'])}")
+    lines += [f'{c}\t{dem}\t{e}\t{l}'
+              for c, dem, e, l in zip(data['customers'], data['demand'], data['earliest'], data['latest'])]
+    lines.append(f"Stations:\t{len(data['stations'])}")
+    lines += list(data['stations'])
+    lines.append(f"Locations:\t{len(data['locations'])}")
+    lines += [f'{label}\t{x}\t{y}' for label, (x, y) in zip(data['locations'], data['coordinates'])]
+    lines.append('-----------------------')
+    lines += [f'{name}: {value}' for name, value in p.items() if name != 'maxTimeLag']
+    return '\n'.join(lines) + '\n'
+
+
+def write(filename, customers, vehicles, stations, seed=0, **params):
+    with open(filename, 'w') as f:
+        f.write(render(generate(customers, vehicles, stations, seed, **params), **params))
+    return filename
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate random CDP instances (.rmc files)')
+    parser.add_argument('customers', type=int)
+    parser.add_argument('--vehicles', type=int, help='default: a third of the customers, at least 2')
+    parser.add_argument('--stations', type=int, help='default: one per 10 customers')
+    parser.add_argument('--count', type=int, default=1, help='instances, with consecutive seeds')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--folder', default='.')
+    for name, value in DEFAULTS.items():
+        parser.add_argument(f'--{name}', type=type(value), default=value)
+    args = parser.parse_args()
+
+    vehicles = args.vehicles or max(2, args.customers // 3)
+    stations = args.stations or max(1, args.customers // 10)
+    params = {name: getattr(args, name) for name in DEFAULTS}
+    os.makedirs(args.folder, exist_ok=True)
+    for n in range(args.count):
+        # named like A_2_5_1.rmc: vehicles, customers, then the seed
+        filename = os.path.join(args.folder, f'A_{vehicles}_{args.customers}_{args.seed + n}.rmc')
+        write(filename, args.customers, vehicles, stations, args.seed + n, **params)
+    print(f'{args.count} instances written to {args.folder}')
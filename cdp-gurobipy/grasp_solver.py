@@ -1,4 +1,228 @@
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import instance as i
+import solution as s
+
+worker = None  # per process state of the parallel multi-start: (instance, attached shared memory blocks)
+
+
+def share(data):
+    # Copy the instance arrays into shared memory blocks; spec is what workers need to attach to them
+    blocks, spec = [], {}
+    for name, array in data.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, spec
+
+
+def init_worker(spec):
+    # Build the instance once per worker process, on top of the shared (read-only) arrays.
+    # Workers share the parent's resource tracker, so the blocks are unlinked only once, by the parent
+    global worker
+    blocks, data = [], {}
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.flags.writeable = False
+        blocks.append(block)
+        data[name] = array
+    worker = (i.Instance(None, data=data), blocks)
+
+
+def run_worker(alpha, iterations, time_limit, seed):
+    # One independent GRASP run; only the visits travel back, the parent replays them on its own instance.
+    # None when the run had no time (or no iteration) to build a solution
+    heuristic = ConstHeurSolver(worker[0], alpha)
+    best = heuristic.solve(iterations, time_limit, seed, verbose=False)
+    if best is None:
+        return None
+    return best.fitness, best.actions, heuristic.order
+
+
 class ConstHeurSolver():
     def __init__(self, instance, alpha = 0.4):
         self.instance = instance
-        self.alpha = alpha
\ No newline at end of file
+        self.alpha = alpha  # 0 is pure greedy, 1 is pure random
+        self.best = None  # best solution found so far
+        self.order = None  # customer sequence that decodes into the best solution
+        self.effort = 50  # deliveries tried when inserting one customer
+        self.sample = 25  # customers scored again per construction step, see construct()
+        self.moves = 100  # tails decoded by one local search, see local_search()
+        self.reach = 20  # how many positions earlier an unserved customer may be moved
+
+    def solve(self, iterations=100, time_limit=None, seed=0, verbose=True):
+        # GRASP: randomized greedy construction followed by local search, keep the best over all iterations
+        rng = random.Random(seed)
+        start = time.perf_counter()
+        deadline = math.inf if time_limit is None else start + time_limit
+        for it in range(iterations):
+            if time.perf_counter() >= deadline:
+                break
+            order = self.construct(rng, deadline)
+            candidate, order = self.local_search(order, deadline)
+            if self.best is None or self.better(candidate, self.best):
+                self.best, self.order = candidate, order
+                if verbose:
+                    print(f'GRASP iteration {it}: {self.best.fitness} served tons '
+                          f'({time.perf_counter() - start:.2f}s)')
+        return self.best
+
+    def solve_parallel(self, workers=None, iterations=100, time_limit=None, seed=0, verbose=True):
+        # Multi-start GRASP: independent runs with seeds seed, seed + 1, ... spread over worker processes, which
+        # share the iterations (never more workers than iterations). The instance arrays are placed once in shared
+        # memory instead of being pickled for every task.
+        workers = max(1, min(workers or os.cpu_count(), iterations))
+        shares = [iterations // workers + (n < iterations % workers) for n in range(workers)]
+        blocks, spec = share(self.instance.data)
+        try:
+            with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(spec,)) as pool:
+                runs = [pool.submit(run_worker, self.alpha, shares[n], time_limit, seed + n) for n in range(workers)]
+                results = [r for r in (run.result() for run in runs) if r is not None]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        if results:
+            fitness, actions, order = max(results, key=lambda r: r[0])
+            best = s.Solution(self.instance)
+            for (v, c, start, departure) in actions:
+                best.apply(c, start)  # same vehicle choices, vehicles are scanned in the same order everywhere
+            best.journal = []
+            if self.best is None or self.better(best, self.best):
+                self.best, self.order = best, order
+        if verbose:
+            if self.best is None:
+                print(f'GRASP with {workers} workers: no solution')
+            else:
+                print(f'GRASP with {workers} workers: {self.best.fitness} served tons')
+        return self.best
+
+    def starts(self, solution, c):
+        # Candidate start times for the next delivery of customer c: as soon as each vehicle gets there, or late
+        # enough that another vehicle arrives within the maximum lag after it (so the following delivery still fits)
+        lo = solution.times[c]  # not before the previous delivery ends (or the window opens)
+        lag = self.instance.maxLag
+        sl = min(self.instance.serviceLength.values())
+        arrivals = [solution.times[v] + self.instance.distance(pos, c) for v, pos in solution.position.items()]
+        candidates = {max(lo, a) for a in arrivals} | {a - sl - lag for a in arrivals}
+        if solution.started(c):
+            candidates.add(lo + lag)  # stretch as far as the lag allows
+        return sorted(t for t in candidates
+                      if lo <= t and t >= min(arrivals) and t + sl <= self.instance.latest[c]
+                      and (not solution.started(c) or t <= lo + lag))
+
+    def serve(self, solution, c, budget=None):
+        # Deliver the whole demand of customer c in place, trying the candidate starts of each delivery in increasing
+        # order (depth first, undoing dead ends). False, with the state unchanged, if c cannot be completed within
+        # the budget of attempted deliveries
+        budget = [self.effort] if budget is None else budget
+        for t in self.starts(solution, c):
+            if budget[0] <= 0:
+                return False
+            budget[0] -= 1
+            if solution.apply(c, t) is None:
+                continue
+            if solution.pending[c] <= 0 or self.serve(solution, c, budget):
+                return True
+            solution.undo()
+        return False
+
+    def busy(self, solution):  # total vehicle time used, breaks ties between equally served solutions
+        return sum(solution.times[v] for v in solution.position)
+
+    def better(self, a, b):
+        return (a.fitness, -self.busy(a)) > (b.fitness, -self.busy(b))
+
+    def construct(self, rng, deadline=math.inf):
+        # Randomized greedy: repeatedly serve a customer taken from the restricted candidate list (RCL).
+        # Customers are scored on their whole demand, a chain of deliveries within the lag, which
+        # Solution.candidates() (one delivery at a time) cannot score; nor is it worth it as a filter, customers
+        # that do not fit are rejected by serve() in a few starts.
+        # Scores are kept from step to step: a score gets out of date only when a vehicle of the plan it was found
+        # with moves (the plans of the others are still feasible at the same cost), and at most self.sample out of
+        # date customers are scored again per step. Stops at the deadline with a partial order
+        current = s.Solution(self.instance)
+        scores = dict()  # customer -> (served tons per busy minute, vehicles of the plan it was scored with)
+        stale = set(self.instance.demand)  # customers without an up to date score
+        order = []
+        while (scores or stale) and time.perf_counter() < deadline:
+            waiting = [c for c in self.instance.demand if c in stale]  # file order, so that seeds are reproducible
+            batch = waiting if len(waiting) <= self.sample else rng.sample(waiting, self.sample)
+            before = self.busy(current)
+            for c in batch:
+                stale.discard(c)
+                mark = len(current.journal)
+                if not self.serve(current, c):
+                    continue  # vehicle times only grow, so customers that do not fit now never will: drop them
+                used = self.busy(current) - before
+                scores[c] = (self.instance.demand[c] / max(used, 1), {e[0] for e in current.journal[mark:]})
+                current.rollback(mark)
+            if not scores:
+                continue
+            options = [(scores[c][0], c) for c in self.instance.demand if c in scores]
+            hi = max(o[0] for o in options)
+            lo = min(o[0] for o in options)
+            rcl = [o for o in options if o[0] >= hi - self.alpha * (hi - lo)]
+            score, c = rng.choice(rcl)
+            del scores[c]
+            mark = len(current.journal)
+            if not self.serve(current, c):  # the search of serve() may miss the scored plan now, drop c as above
+                continue
+            order.append(c)
+            moved = {e[0] for e in current.journal[mark:]}
+            for u in [u for u in scores if scores[u][1] & moved]:
+                del scores[u]
+                stale.add(u)
+        # unserved customers go last, so that local search can try to move them forward
+        return order + [c for c in self.instance.demand if c not in order]
+
+    def decode(self, order, solution):
+        # Serve the customers of the order in place, skipping those that no longer fit. marks[n] is the journal
+        # length after the first n customers, so that any prefix state can be restored with rollback()
+        marks = [len(solution.journal)]
+        for c in order:
+            self.serve(solution, c)
+            marks.append(len(solution.journal))
+        return marks
+
+    def local_search(self, order, deadline):
+        # First improvement: move an unserved customer to an earlier position of the sequence.
+        # Prefixes are unchanged by such a move, so only the tail is decoded again. The scan goes on from where the
+        # last improvement was found (wrapping around) and stops after a full pass without gain, or once self.moves
+        # tails were decoded, so that every GRASP iteration stays short
+        current = s.Solution(self.instance)
+        marks = self.decode(order, current)
+        moves = self.moves
+        n, idle = 0, 0  # scan position, positions scanned since the last improvement
+        while idle < len(order) and moves > 0 and time.perf_counter() < deadline:
+            u = order[n]
+            if current.pending[u] > 0:  # else already served
+                for p in range(max(0, n - self.reach), n):
+                    if moves <= 0 or time.perf_counter() >= deadline:
+                        break
+                    moves -= 1
+                    key = (current.fitness, -self.busy(current))
+                    tail = current.rollback(marks[p])
+                    candidate = order[:p] + [u] + order[p:n] + order[n + 1:]
+                    moved = self.decode(candidate[p:], current)
+                    if (current.fitness, -self.busy(current)) > key:
+                        order = candidate
+                        marks = marks[:p] + moved
+                        idle = 0
+                        break
+                    current.rollback(marks[p])  # no gain: replay the previous tail, its moves are known
+                    for (c, t) in tail:
+                        current.apply(c, t)
+            n = (n + 1) % len(order)
+            idle += 1
+        return current.status(), order
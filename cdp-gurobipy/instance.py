@@ -1,4 +1,11 @@
+import hashlib
 import math
+import os
+
+import numpy as np
+
+CACHE_FORMAT = 1  # bump whenever parse() or travel_times() change, so stale caches get rebuilt
+CACHE_MIN_BYTES = 3000  # smaller files (below about 100 customers) parse faster than their cache is hashed and read
 
 
 def euclidean(p1, p2):
@@ -7,13 +14,123 @@ def euclidean(p1, p2):
     return math.sqrt(sum([(p1[i] - p2[i]) ** 2 for i in range(n)]))
 
 
-class Instance():
-    def __init__(self, filename):
-        print(f'Parsing instance from {filename}')  # Convert data from one format to another
+def digest(filename):  # content hash of an instance file, used to validate its binary cache
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def parse(filename):
+    # Stream an .rmc file into flat arrays (labels in file order, one array per attribute)
+    vehicles, capacity, service_length = [], [], []
+    customers, demand, earliest, latest = [], [], [], []
+    stations = []
+    locations, coordinates = [], []
+    max_lag = None
+
+    reading_locations = False
+    with open(filename) as lines:
+        for line in lines:
+            if '-----' in line:  # the generation parameters begin
+                break  # no need to parse any further
+            if 'Locations' in line:  # the coordinate info begins
+                reading_locations = True
+                continue
+            if reading_locations:  # parsing coordinate data
+                fields = line.split()
+                locations.append(fields[0])
+                coordinates.append((int(fields[1]), int(fields[2])))
+            else:
+                if 'MaxTimeLag' in line:
+                    max_lag = int(line.split()[-1])
+                if line[0] == 'k':  # a vehicle definition: label, capacity, service length
+                    fields = line.split()
+                    vehicles.append(fields[0])
+                    capacity.append(int(fields[1]))
+                    service_length.append(int(fields[2]))
+                if line[0] == 'c':  # a customer definition: label, demand, delivery window
+                    fields = line.split()
+                    assert int(fields[2]) <= int(fields[3])
+                    customers.append(fields[0])
+                    demand.append(int(fields[1]))
+                    earliest.append(int(fields[2]))
+                    latest.append(int(fields[3]))
+                if line[0] == 's':  # a station definition
+                    stations.append(line.strip())  # no data associated
+
+    return {
+        'vehicles': np.array(vehicles, dtype=str),
+        'capacity': np.array(capacity, dtype=int),
+        'serviceLength': np.array(service_length, dtype=int),
+        'customers': np.array(customers, dtype=str),
+        'demand': np.array(demand, dtype=int),
+        'earliest': np.array(earliest, dtype=int),
+        'latest': np.array(latest, dtype=int),
+        'stations': np.array(stations, dtype=str),
+        'locations': np.array(locations, dtype=str),
+        'coordinates': np.array(coordinates, dtype=int).reshape(-1, 2),
+        'maxLag': np.array(max_lag, dtype=int),
+    }
+
+
+def travel_times(locations, coordinates, stations):
+    # All travel times at once, rounded up as integers
+    labels = [str(l) for l in locations]
+    index = {l: n for n, l in enumerate(labels)}
+    points = coordinates.astype(float)
+
+    # direct[i, j] is the straight line distance between locations i and j
+    delta = points[:, np.newaxis, :] - points[np.newaxis, :, :]
+    direct = np.sqrt((delta ** 2).sum(axis=2))
+
+    # via[i, j] is the shortest detour i -> s -> j through any station s (the truck must load in between)
+    # running minimum over the stations, so that memory stays O(locations²) however many stations there are
+    via = np.full_like(direct, np.inf)
+    for s in stations:
+        n = index[str(s)]
+        np.minimum(via, direct[:, n, np.newaxis] + direct[np.newaxis, n, :], out=via)
 
-        self.vehicles = set()
-        self.customers = set()
-        self.stations = set()
+    # origin or destination is a station, or destination is the final depot: go straight
+    straight = np.array(['s' in l for l in labels])
+    use_direct = straight[:, np.newaxis] | straight[np.newaxis, :]
+    use_direct[:, [n for n, l in enumerate(labels) if l == 'v1']] = True
+
+    return np.ceil(np.where(use_direct, direct, via)).astype(int)
+
+
+def load(filename, cache=True):
+    # Parsed arrays of an instance, read from '<filename>.npz' when it matches the file hash. Every array is read
+    # at once, Instance() needs them all. Small files are always parsed, see CACHE_MIN_BYTES
+    # the file is hashed only when its cache is used, so plain parses (and small files) skip it
+    cache = cache and os.path.getsize(filename) >= CACHE_MIN_BYTES
+    key = f'{CACHE_FORMAT}:{digest(filename)}' if cache else None
+    cached = filename + '.npz'
+    if cache and os.path.exists(cached):
+        with np.load(cached) as stored:
+            if 'digest' in stored.files and str(stored['digest']) == key:
+                return {name: stored[name] for name in stored.files if name != 'digest'}
+
+    data = parse(filename)
+    data['distances'] = travel_times(data['locations'], data['coordinates'], data['stations'])
+    if cache:
+        try:  # write aside and rename, so concurrent runs never read a partial cache
+            partial = f'{cached}.{os.getpid()}.tmp'
+            with open(partial, 'wb') as f:
+                np.savez(f, digest=np.array(key), **data)
+            os.replace(partial, cached)
+        except OSError:
+            pass  # read-only benchmark folders just do not get a cache
+    return data
+
+
+class Instance():
+    def __init__(self, filename, cache=True, data=None):
+        if data is None:
+            print(f'Parsing instance from {filename}')  # Convert data from one format to another
+            data = load(filename, cache)
+        self.data = data  # compact array representation, see parse() (may also come already parsed, e.g. shared)
 
         self.capacity = dict()  # vehicle capacity  {'k0': 15, 'k1': 15}
         self.serviceLength = dict()  # vehicle service length   {'k0': 15, 'k1': 15}
@@ -22,64 +139,39 @@ class Instance():
         self.latest = dict()  # customer service window end     {'c0': 250, 'c1': 310, 'c2': 450, 'c3': 380, 'c4': 240}
         self.coordinates = dict()  # location coordinates {'v0': (50, 50), 'v1': (50, 50), 's0': (49, 39), 'c0': (34,
         # 60), etc.}
-        self.distances = dict()  # distances
+        self.index = dict()  # location label -> row/column in the distance matrix {'v0': 0, 'v1': 1, 's0': 2, ...}
+        self.distances = self.data['distances']  # travel time matrix (numpy), indexed through self.index
         self.inter = None  # intermediate coordinates of stations, to calculate the nearest plant to another customer
 
-        self.maxLag = None
-        counts = {'Vehicles': None, 'Customers': None, 'Stations': None}
-
-        reading_locations = False
-        with open(filename) as lines:
-            for line in lines:
-                if '-----' in line:  # the generation parameters begin
-                    break  # no need to parse any further
-                if 'Locations' in line:  # the coordinate info begins
-                    self.vehicles = set(self.capacity.keys())
-                    self.customers = set(self.demand.keys())
-                    reading_locations = True
-                    continue
-                if reading_locations:  # parsing coordinate data
-                    fields = line.split()
-                    l = fields[0]
-                    x = int(fields[1])
-                    y = int(fields[2])
-                    self.coordinates[l] = (x, y)
-                else:
-                    if 'MaxTimeLag' in line:
-                        self.maxLag = int(line.split()[-1])
-                    for counter in counts.keys():
-                        if counter in line:
-                            counts[counter] = int(line.split()[-1])
-                    if line[0] == 'k':  # a vehicle definition
-                        fields = line.split()
-                        label = fields[0]  # vehicle label
-                        self.capacity[label] = int(fields[1])  # vehicle capacity
-                        self.serviceLength[label] = int(fields[2])  # service length
-                    if line[0] == 'c':  # a customer definition
-                        fields = line.split()
-                        label = fields[0]  # customer label
-                        demand = int(fields[1])  # customer demand
-                        tw_start = int(fields[2])  # delivery window opens
-                        tw_end = int(fields[3])  # delivery window ends
-                        assert tw_start <= tw_end
-                        self.demand[label] = demand
-                        self.earliest[label] = tw_start
-                        self.latest[label] = tw_end
-                    if line[0] == 's':  # a station definition
-                        self.stations.add(line.strip())  # no data associated
-
-        for s in self.stations:
-            self.inter = [self.coordinates[s] for s in self.stations]
+        self.maxLag = int(self.data['maxLag'])
+
+        for label, cap, sl in zip(self.data['vehicles'], self.data['capacity'], self.data['serviceLength']):
+            self.capacity[str(label)] = int(cap)
+            self.serviceLength[str(label)] = int(sl)
+        for label, dem, tw_start, tw_end in zip(self.data['customers'], self.data['demand'],
+                                                self.data['earliest'], self.data['latest']):
+            self.demand[str(label)] = int(dem)
+            self.earliest[str(label)] = int(tw_start)
+            self.latest[str(label)] = int(tw_end)
+        for n, (label, (x, y)) in enumerate(zip(self.data['locations'], self.data['coordinates'])):
+            self.coordinates[str(label)] = (int(x), int(y))
+            self.index[str(label)] = n
+
+        # customers as columns of per-customer arrays, in file order (see Solution.arrival)
+        self.column = {c: n for n, c in enumerate(self.demand)}  # {'c0': 0, 'c1': 1, ...}
+        self.customerIndex = np.array([self.index[c] for c in self.demand], dtype=int)  # rows in self.distances
+        self.latestArray = np.array(list(self.latest.values()), dtype=int).reshape(-1)
+
+        self.vehicles = set(self.capacity.keys())
+        self.row = {v: n for n, v in enumerate(sorted(self.vehicles))}  # vehicles as rows, in Solution.position order
+        self.capacityArray = np.array([self.capacity[v] for v in self.row], dtype=int).reshape(-1)
+        self.serviceArray = np.array([self.serviceLength[v] for v in self.row], dtype=int).reshape(-1)
+        self.customers = set(self.demand.keys())
+        self.stations = set(str(s) for s in self.data['stations'])
+
+        self.inter = [self.coordinates[s] for s in self.stations]
 
         self.minCapacity = min(self.capacity.values())  # Minimum Capacity of a Vehicle
 
     def distance(self, origin, destination) -> int:
-        p1 = self.coordinates[origin]
-        p2 = self.coordinates[destination]
-        d = None
-        if 's' in origin or 's' in destination or 'v1' == destination:
-            # origin or destination is a station, or destination is the final depot
-            d = euclidean(p1, p2)
-        else:  # nearest possible midpoint
-            d = min([euclidean(p1, self.coordinates[s]) + euclidean(self.coordinates[s], p2) for s in self.stations])
-        return math.ceil(d)
+        return int(self.distances[self.index[origin], self.index[destination]])
@@ -1,7 +1,9 @@
 # Import libraries
-from sys import argv
+import argparse
+from gurobipy import GRB
 
 # Import other project files
+import cache
 import instance as i
 import solution as s
 import mip_model_solver as mip
@@ -20,14 +22,29 @@ def print_hi(name):
 # Press the green button in the gutter to run the script.
 if __name__ == '__main__':
     print_hi('PyCharm')
-    filename = None
-    try:
-        filename = argv[1]
-    except:
-        filename = 'A_2_5_1.rmc'  # small default instance
-
-    data = i.Instance(filename)
-    solver = mip.MIPSolver(data)
+    parser = argparse.ArgumentParser(description='Solve a CDP instance with the MIP')
+    parser.add_argument('filename', nargs='?', default='A_2_5_1.rmc')  # small default instance
+    parser.add_argument('export', nargs='?', help='e.g. model-cdp.lp, the model is only written when asked')
+    for name, kind in mip.PARAMETERS.items():
+        parser.add_argument(f'--{name}', type=kind, help='Gurobi parameter')
+    parser.add_argument('--cache', help='folder of solutions kept between runs, reused as MIP starts')
+    args = parser.parse_args()
+    params = {name: getattr(args, name) for name in mip.PARAMETERS if getattr(args, name) is not None}
+
+    data = i.Instance(args.filename)
+    store = None if args.cache is None else cache.SolutionCache(args.cache)
+    entry, exact = (None, False) if store is None else store.lookup(data, params)
+    if exact and entry['status'] == GRB.OPTIMAL:
+        print(f"Cached optimal solution: {entry['objective']:.2f} served tons")
+        for (v, c, start, departure) in entry['actions']:
+            print(f' Vehicle {v} visits {c} at time {start} and leaves at time {departure}')
+    else:
+        solver = mip.MIPSolver(data)
+        solver.build(write=args.export)
+        result = solver.solve(params, start=None if entry is None else store.start(data, entry))
+        result.report(solver)
+        if store is not None:
+            store.save(data, params, solver, result)
     #solution = s.Solution(data)
 
 # See PyCharm help at https://www.jetbrains.com/help/pycharm/
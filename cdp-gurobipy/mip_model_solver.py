@@ -2,19 +2,209 @@ import gurobipy as gp
 from gurobipy import GRB
 import math
 import sys
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+# Gurobi parameters worth setting on this model (see tune.py), with their types; solve() accepts any other as well
+PARAMETERS = {'Threads': int, 'MIPFocus': int, 'Cuts': int, 'Heuristics': float, 'TimeLimit': float, 'MIPGap': float,
+              'Seed': int}
+
+class MIPResult:
+    # Values of a solved model, extracted in bulk (see MIPSolver.result())
+    def __init__(self, status, objective, bound, gap, runtime):
+        self.status = status  # Gurobi status code (GRB.OPTIMAL, GRB.TIME_LIMIT, ...)
+        self.objective = objective  # served tons of the incumbent, None when there is no solution
+        self.bound = bound
+        self.gap = gap
+        self.runtime = runtime  # seconds spent in optimize()
+        self.routes = dict()  # vehicle label -> graph nodes visited, in order  {'k0': [0, 9, 1, 13], 'k1': [0, 13]}
+        self.times = None  # completion time of every graph node (numpy), C in the model
+        self.served = dict()  # customer label -> tons delivered  {'c0': 30, 'c1': 0, ...}
+        self.covered = dict()  # customer label -> whether its whole demand is served (y in the model)
+
+    def report(self, solver):
+        # Print the routes, one line per vehicle, with the customer and completion time of each visit
+        if self.objective is None:
+            print(f'No solution found (status {self.status}), bound {self.bound:.2f}')
+            return
+        for v, route in self.routes.items():
+            visits = [f'{i} ({solver.graphNodes[i]}, {self.times[i]:.0f})' for i in route[1:-1]]
+            print(f'Vehicle {v}: ' + ' -> '.join(['v0'] + visits + ['v1']))
+        for c, tons in self.served.items():
+            print(f'Customer {c}: {tons} of {solver.instance.demand[c]} tons' +
+                  (' (served)' if self.covered[c] else ''))
+        print(f"Total served tons: {self.objective:.2f}")
+
+    def deliveries(self, solver):
+        # Visits of the routes as (start, vehicle, customer), in start time order, e.g. to replay on a Solution
+        visits = []
+        for v, route in self.routes.items():
+            for i in route[1:-1]:
+                visits.append((int(round(self.times[i])) - solver.instance.serviceLength[v], v, solver.graphNodes[i]))
+        return sorted(visits)
 
 
 class MIPSolver:
-    def __init__(self, instance):
+    def __init__(self, instance, tighten=True, origin=None):
         self.instance = instance
+        # where and when each vehicle becomes available {'k0': ('c3', 240), ...}; by default all at the depot at 0
+        self.origin = origin or {v: ('v0', 0) for v in self.instance.vehicles}
+        self.vehicles = sorted(self.instance.vehicles)  # vehicle k of the model, the same from run to run
         self.nodes = dict()  # {0: 'v0', 1: 'c0', 2: 'c1', 3: 'c2', 4: 'c3', 5: 'c4', 6: 's0', 7: 'v1'}
         self.graphNodes = dict()    # {0: 'v0', 1: 'c0', 2: 'c0', 3: 'c1', 4: 'c1', ... , 12: 'c4', 13: 'v1'}
+        self.timings = dict()  # seconds spent in each phase {'init_graph': 0.01, 'init_arcs': 0.2, 'build': 1.5, ...}
 
+        start = time.perf_counter()
         self.init_graph()
-        M = 1000000
+        self.timings['init_graph'] = time.perf_counter() - start
+        self.M = 1000000
+        self.tighten = tighten
+        self.arcs = dict()  # usable arcs (i, j, k) -> big-M of their time consistency constraint (27) or (28)
+        self.outgoing = dict()  # sparse graph per vehicle: (i, k) -> [j, ...] such that (i, j, k) is an arc
+        self.incoming = dict()  # (j, k) -> [i, ...] such that (i, j, k) is an arc
+        self.twins = []  # pairs (k', k) of identical vehicles, consecutive within their class
+        self.release = None  # (K, N) earliest completion of each graph node when it is the first one after the origin
+        start = time.perf_counter()
+        self.init_arcs()
+        self.timings['init_arcs'] = time.perf_counter() - start
+
+        self.model, self.y, self.x, self.C = None, None, None, None  # set by build()
+
+    def build(self, matrix=False, write=None, env=None):
+        # Create the Gurobi model. Both builders produce the same model; the matrix one avoids the per-term
+        # Python overhead. write exports it (e.g. 'model-cdp.lp'), which is slow on big models, so only on demand
+        begin = time.perf_counter()
+        model = gp.Model(env=env)
+        if matrix:
+            y, x, C = self.build_matrix(model)
+        else:
+            y, x, C = self.build_loops(model)
+        model.update()  # flush the pending changes, so that they count as build time
+        self.model, self.y, self.x, self.C = model, y, x, C
+        self.timings['build'] = time.perf_counter() - begin
+        if write is not None:
+            begin = time.perf_counter()
+            model.write(write)
+            self.timings['write'] = time.perf_counter() - begin
+        return model
+
+    def solve(self, params=None, start=None, progress=None):
+        # Optimize with the given Gurobi parameters (e.g. {'TimeLimit': 60}), from a known solution (e.g. from the
+        # GRASP) if any. progress is an optional progress.Progress, recording the search over time.
+        # Builds the model first if needed
+        if self.model is None:
+            self.build()
+        for name, value in (params or {}).items():
+            self.model.setParam(name, value)
+        if start is not None:
+            begin = time.perf_counter()
+            self.warm_start(start)
+            self.timings['warm_start'] = time.perf_counter() - begin
+        begin = time.perf_counter()
+        if progress is None:
+            self.model.optimize()
+        else:
+            self.model.optimize(progress)
+            progress.finish(self.model)
+        self.timings['optimize'] = time.perf_counter() - begin
+        return self.result()
 
-        # Create a new Gurobi model
-        model = gp.Model()
+    def result(self):
+        # Solution values in one getAttr call per variable family, instead of querying .x variable by variable
+        model = self.model
+        found = model.SolCount > 0
+        result = MIPResult(model.Status, model.ObjVal if found else None, model.ObjBound,
+                           model.MIPGap if found else None, model.Runtime)
+        if not found:
+            return result
+
+        N = len(self.graphNodes)
+        last = N - 1
+        vehicles = self.vehicles
+        arcs = np.array(list(self.x.keys()), dtype=int).reshape(-1, 3)
+        used = arcs[np.array(model.getAttr('X', list(self.x.values()))) > 0.5]
+        y = np.array(model.getAttr('X', list(self.y.values()))) > 0.5
+        result.times = np.array(model.getAttr('X', [self.C[i] for i in range(N)]))
+
+        successor = {(k, i): j for (i, j, k) in used.tolist()}
+        for k, v in enumerate(vehicles):
+            route = [0]
+            while route[-1] != last:
+                route.append(successor[k, route[-1]])
+            result.routes[v] = route
+
+        capacity = np.array([self.instance.capacity[v] for v in vehicles])
+        labels = np.array([self.graphNodes[i] for i in range(N)])
+        delivering = used[(used[:, 0] != 0)]  # arcs leaving a delivery
+        for cid, c in enumerate(self.instance.demand):
+            result.served[c] = int(capacity[delivering[labels[delivering[:, 0]] == c, 2]].sum())
+            result.covered[c] = bool(y[cid])
+        return result
+
+    def warm_start(self, solution):
+        # Map a heuristic Solution (its visits, in order) onto x, y and C and set it as the MIP start.
+        # The n-th delivery to a customer takes the n-th graph node of that customer, as (25) requires.
+        last = len(self.graphNodes) - 1
+        copies = dict()  # {'c0': [1, 2], 'c1': [3, 4], ...}
+        for i, label in self.graphNodes.items():
+            if i != 0 and i != last:
+                copies.setdefault(label, []).append(i)
+
+        x_start = {arc: 0 for arc in self.x}
+        C_start = {0: 0}
+        used = {c: 0 for c in copies}  # deliveries already mapped per customer
+        vehicle = {label: k for k, label in enumerate(self.vehicles)}
+        route = {k: [] for k in vehicle.values()}  # graph nodes visited by each vehicle, in order
+        for (v, c, start, departure) in solution.actions:
+            if used[c] >= len(copies[c]):
+                continue  # more deliveries than graph nodes for c; not representable in the model
+            i = copies[c][used[c]]
+            used[c] += 1
+            route[vehicle[v]].append(i)
+            C_start[i] = departure  # delivery completion time
+
+        # identical vehicles exchange routes so that they are ordered by their first node, as (32) requires
+        classes = []  # chains of identical vehicles
+        for prev, k in self.twins:
+            chain = next((chain for chain in classes if chain[-1] == prev), None)
+            if chain is None:
+                classes.append([prev, k])
+            else:
+                chain.append(k)
+        for chain in classes:
+            routes = sorted((route[k] for k in chain), key=lambda r: (r or [last])[0])  # idle ones go to the sink
+            for k, r in zip(chain, routes):
+                route[k] = r
+
+        C_start[last] = 0
+        for k, label_k in enumerate(self.vehicles):
+            path = [0] + route[k] + [last]
+            for i, j in zip(path, path[1:]):
+                x_start[i, j, k] = 1
+            if route[k]:  # arrival to the final depot, as in (27)
+                i = route[k][-1]
+                C_start[last] = max(C_start[last], C_start[i] + self.instance.serviceLength[label_k] +
+                                    self.instance.distance(self.graphNodes[i], 'v1'))
+
+        # unused graph nodes take the completion time of the previous delivery (or the window start), so that
+        # (30) and (31) hold with no service in between
+        for c, nodes in copies.items():
+            previous = self.instance.earliest[c]
+            for i in nodes:
+                previous = C_start.setdefault(i, previous)
+
+        y_start = {cid: int(solution.pending[label] <= 0) for cid, label in enumerate(self.instance.demand)}
+
+        for values, variables in ((x_start, self.x), (y_start, self.y), (C_start, self.C)):
+            keys = list(variables.keys())
+            self.model.setAttr('Start', [variables[key] for key in keys], [values[key] for key in keys])
+        print(f'MIP start with {solution.fitness} served tons')
+
+    def build_loops(self, model):
+        last = len(self.graphNodes) - 1
+        vehicles = list(enumerate(self.vehicles))
 
         # Add decision variables
         y = {}  # Whether customer i ∈ C is serviced.
@@ -22,18 +212,17 @@ class MIPSolver:
             y[cid] = model.addVar(vtype=GRB.BINARY, name=f"y_{cid}")
 
         x = {}  # Whether vehicle k ∈ K, travels from i to j.
-        for k, label in enumerate(self.instance.vehicles):
-            for i, label_i in enumerate(self.graphNodes):
-                for j, label_j in enumerate(self.graphNodes):
-                    if i != (len(self.graphNodes) - 1) and j != 0:
-                        # not leaving from final depot or returning to an initial
-                        x[i, j, k] = model.addVar(vtype=GRB.BINARY, name=f"x_{i}_{j}_{k}")
+        for (i, j, k) in self.arcs:
+            # not leaving from final depot or returning to an initial, nor (if tightened) unusable
+            x[i, j, k] = model.addVar(vtype=GRB.BINARY, name=f"x_{i}_{j}_{k}")
 
         C = {}  # Record the time that delivery i ∈ D is completed.
         for i, label in self.graphNodes.items():
             if label != 'v0' and label != 'v1':
                 C[i] = model.addVar(vtype=GRB.INTEGER, lb=self.instance.earliest[label], ub=self.instance.latest[label],
                                     name=f"C_{i}")
+            elif i == 0 and self.tighten:
+                C[i] = model.addVar(vtype=GRB.INTEGER, ub=0, name=f"C_{i}")  # vehicles leave the depot at time 0
             else:
                 C[i] = model.addVar(vtype=GRB.INTEGER, name=f"C_{i}")
 
@@ -45,123 +234,313 @@ class MIPSolver:
         # Add constraints
         # Starting and Ending Location of a tour (22)
         # (22) Departure from source (initial depot)
-        for k, label in enumerate(self.instance.vehicles):
-            model.addConstr(gp.quicksum(x[0, j, k] for j in self.graphNodes if j != 0) == 1,
+        for k, label in vehicles:
+            model.addConstr(gp.quicksum(x[0, j, k] for j in self.outgoing[0, k]) == 1,
                             name=f"Departure_from_{0}_vehicle_{k}")
 
         # (22) Arrival to sink (final depot)
-        for k, label in enumerate(self.instance.vehicles):
-            model.addConstr(gp.quicksum(x[i, len(self.graphNodes) - 1, k] for i in self.graphNodes
-                                        if i != len(self.graphNodes) - 1) == 1,
-                            name=f"Arrival_to_{len(self.graphNodes) - 1}_vehicle_{k}")
+        for k, label in vehicles:
+            model.addConstr(gp.quicksum(x[i, last, k] for i in self.incoming[last, k]) == 1,
+                            name=f"Arrival_to_{last}_vehicle_{k}")
 
         # Flow conservation (23) - Incoming flow to node i(δ−(i)) minus outgoing flow from node i (δ+(i)) must be 0.
-        for i in self.graphNodes:
-            for k, label in enumerate(self.instance.vehicles):
-                if i != (len(self.graphNodes) - 1) and i != 0:
-                    model.addConstr(gp.quicksum(x[j, i, k]
-                                                for j in self.graphNodes if i != j and j != len(self.graphNodes) - 1)
-                                    - gp.quicksum(x[i, j, k] for j in self.graphNodes if j != 0)
-                                    == 0, name=f"Flow_Conservation_in_node_{i}_vehicle_{k}")
+        for i in range(1, last):
+            for k, label in vehicles:
+                model.addConstr(gp.quicksum(x[j, i, k] for j in self.incoming[i, k] if i != j)
+                                - gp.quicksum(x[i, j, k] for j in self.outgoing[i, k])
+                                == 0, name=f"Flow_Conservation_in_node_{i}_vehicle_{k}")
 
         # Number of times a delivery can be made (at most once) (24)
         # (From node i you can go at most to one place either with one vehicle)
-        for i in self.graphNodes:
-            if i != 0 and i != len(self.graphNodes) - 1:
-                model.addConstr(gp.quicksum(x[i, j, k]
-                                            for k, label in enumerate(self.instance.vehicles)
-                                            for j in self.graphNodes if j != 0) <= 1,
-                                name=f"At_most_one_visit_from_node_{i}")
+        for i in range(1, last):
+            model.addConstr(gp.quicksum(x[i, j, k] for k, label in vehicles for j in self.outgoing[i, k]) <= 1,
+                            name=f"At_most_one_visit_from_node_{i}")
 
         # Deliveries order (25)
-        for i in self.graphNodes:
-            if i != len(self.graphNodes) - 1 and i != 0:    # i not the depots
-                next_i = i + 1
-                if self.graphNodes[i] == self.graphNodes[next_i]:  # if are visits for the same client
-                    model.addConstr(gp.quicksum(x[next_i, j, k] for k, label in enumerate(self.instance.vehicles)
-                                                for j in self.graphNodes if j != 0) <=
-                                    gp.quicksum(x[i, j, k] for k, label in enumerate(self.instance.vehicles)
-                                                for j in self.graphNodes if j != 0),
-                                    name=f"Deliver_at_node_{next_i}_cannot_be_performed_if_at_{i}_hasn't")
+        for i in range(1, last):    # i not the depots
+            next_i = i + 1
+            if self.graphNodes[i] == self.graphNodes[next_i]:  # if are visits for the same client
+                model.addConstr(gp.quicksum(x[next_i, j, k] for k, label in vehicles for j in self.outgoing[next_i, k])
+                                <= gp.quicksum(x[i, j, k] for k, label in vehicles for j in self.outgoing[i, k]),
+                                name=f"Deliver_at_node_{next_i}_cannot_be_performed_if_at_{i}_hasn't")
 
         # Cover customer demands, according the capacity of vehicles (26)
         for c, label_c in enumerate(self.instance.demand):
-                    model.addConstr(gp.quicksum(self.instance.capacity[label_k] * x[i, j, k]
-                                                for k, label_k in enumerate(self.instance.vehicles)
-                                                for i in self.graphNodes if i != 0 and self.graphNodes[i] == label_c
-                                                for j in self.graphNodes if j != 0) >=
-                                    self.instance.demand[label_c] * y[c],
-                                    name=f"Covering_customer_{c}")
+            model.addConstr(gp.quicksum(self.instance.capacity[label_k] * x[i, j, k]
+                                        for k, label_k in vehicles
+                                        for i in self.graphNodes if i != 0 and self.graphNodes[i] == label_c
+                                        for j in self.outgoing[i, k]) >=
+                            self.instance.demand[label_c] * y[c],
+                            name=f"Covering_customer_{c}")
 
         # Time Consistency
         # (27)
-        for k, label_v in enumerate(self.instance.vehicles):
-            for i, label_i in self.graphNodes.items():
-                for j, label_j in self.graphNodes.items():
-                    if i != 0 and i != len(self.graphNodes) - 1 and j != 0:
-                        model.addConstr(C[i] - M*(1 - x[i, j, k]) <=
-                                        C[j] - self.instance.serviceLength[label_v] -
-                                        self.instance.distance(label_i, label_j),
-                                        name=f"Time_Consistency_traveling_from_{i}_to_{j}_with_vehicle_{k}")
-        
+        for k, label_v in vehicles:
+            for i in range(1, last):
+                for j in self.outgoing[i, k]:
+                    model.addConstr(C[i] - self.arcs[i, j, k]*(1 - x[i, j, k]) <=
+                                    C[j] - self.instance.serviceLength[label_v] -
+                                    self.instance.distance(self.graphNodes[i], self.graphNodes[j]),
+                                    name=f"Time_Consistency_traveling_from_{i}_to_{j}_with_vehicle_{k}")
+
         # (28)
-        for k, label_v in enumerate(self.instance.vehicles):
-            for j, label_j in self.graphNodes.items():
-                if j != 0:
-                    model.addConstr(C[0] - M * (1 - x[0, j, k]) <= C[j] - self.instance.distance('v0', label_j),
-                                    name=f"Time_Consistency_traveling_from_depot_to_{j}_with_vehicle_{k}")
+        for k, label_v in vehicles:
+            for j in self.outgoing[0, k]:
+                model.addConstr(C[0] - self.arcs[0, j, k] * (1 - x[0, j, k]) <=
+                                C[j] - self.release[k, j],
+                                name=f"Time_Consistency_traveling_from_depot_to_{j}_with_vehicle_{k}")
 
         # Lower Time Window (29)
-        for i, label_i in self.graphNodes.items():
-            if i != len(self.graphNodes) - 1 and i != 0:    # i not the depots
-                model.addConstr(C[i] - gp.quicksum(self.instance.serviceLength[label_k] * x[i, j, k]
-                                                   for k, label_k in enumerate(self.instance.vehicles)
-                                                   for j in self.graphNodes if j != 0) >=
-                                self.instance.earliest[label_i],
-                                name=f"Ending_time_visit_{i}_later_than_init_tw")
+        for i in range(1, last):    # i not the depots
+            model.addConstr(C[i] - gp.quicksum(self.instance.serviceLength[label_k] * x[i, j, k]
+                                               for k, label_k in vehicles for j in self.outgoing[i, k]) >=
+                            self.instance.earliest[self.graphNodes[i]],
+                            name=f"Ending_time_visit_{i}_later_than_init_tw")
 
         # Maximum time lag (30)
-        for i in self.graphNodes:
-            if i != len(self.graphNodes) - 1 and i != 0:    # i not the depots
-                next_i = i + 1
-                if self.graphNodes[i] == self.graphNodes[next_i]:  # if are visits for the same client
-                    model.addConstr(C[next_i] - gp.quicksum(self.instance.serviceLength[label_k] * x[j, next_i, k]
-                                                            for k, label_k in enumerate(self.instance.vehicles)
-                                                            for j in self.graphNodes if j != len(self.graphNodes) - 1)
-                                    - C[i] <= self.instance.maxLag,
-                                    name=f"Consecutive_deliveries_{i}_and_{next_i}_not_exceeding_customer_lag")
+        for i in range(1, last):    # i not the depots
+            next_i = i + 1
+            if self.graphNodes[i] == self.graphNodes[next_i]:  # if are visits for the same client
+                model.addConstr(C[next_i] - gp.quicksum(self.instance.serviceLength[label_k] * x[j, next_i, k]
+                                                        for k, label_k in vehicles for j in self.incoming[next_i, k])
+                                - C[i] <= self.instance.maxLag,
+                                name=f"Consecutive_deliveries_{i}_and_{next_i}_not_exceeding_customer_lag")
 
         # No overlap for the same customer (31)
-        for i in self.graphNodes:
-            if i != len(self.graphNodes) - 1 and i != 0:  # i not the depots
-                next_i = i + 1
-                if self.graphNodes[i] == self.graphNodes[next_i]:
-                    model.addConstr(C[next_i] >= C[i] +
-                                    gp.quicksum(self.instance.serviceLength[label_k] * x[j, next_i, k]
-                                                for k, label_k in enumerate(self.instance.vehicles)
-                                                for j in self.graphNodes if j != len(self.graphNodes) - 1),
-                                    name=f"Delivery_{i}_to_{next_i}_of_same_customer_not_overlapping")
-
-        model.write('model-cdp.lp')
-
-        # Optimize the model
-        model.optimize()
-
-        # Print
-        for cid, label in enumerate(self.instance.customers):
-            if y[cid].x > 0.5:
-                print(f"y_{cid} = {y[cid].x}")
-
-        for k, label_k in enumerate(self.instance.vehicles):
-            #print(f"Vehicle {k}:")
-            for i in self.graphNodes:
-                for j in self.graphNodes:
-                    if i != (len(self.graphNodes) - 1) and j != 0 and x[i, j, k].x > 0.5:
-                        print(f"x_{i}_{j}_{k} = {x[i, j, k].x}")
+        for i in range(1, last):  # i not the depots
+            next_i = i + 1
+            if self.graphNodes[i] == self.graphNodes[next_i]:
+                model.addConstr(C[next_i] >= C[i] +
+                                gp.quicksum(self.instance.serviceLength[label_k] * x[j, next_i, k]
+                                            for k, label_k in vehicles for j in self.incoming[next_i, k]),
+                                name=f"Delivery_{i}_to_{next_i}_of_same_customer_not_overlapping")
 
-        for i, label in self.graphNodes.items():
-            print(f"C_{i} = {C[i].x}")
-        print(f"Total served tons: {model.objVal:.2f}")
+        # Identical vehicles (32): ordered by the first graph node they visit (idle ones go straight to the sink)
+        for prev, k in self.twins:
+            model.addConstr(gp.quicksum(j * x[0, j, prev] for j in self.outgoing[0, prev]) <=
+                            gp.quicksum(j * x[0, j, k] for j in self.outgoing[0, k]),
+                            name=f"Identical_vehicles_{prev}_and_{k}_in_order")
+
+        return y, x, C
+
+    def build_matrix(self, model):
+        # Same variables and constraints (and names) as build_loops(), but every family is emitted at once as a
+        # sparse matrix through addMConstr. Columns are laid out as [y | x | C], x following self.arcs.
+        N = len(self.graphNodes)
+        last = N - 1
+        labels = [self.graphNodes[i] for i in range(N)]
+        vehicles = self.vehicles
+        K = len(vehicles)
+        nY = len(self.instance.customers)
+        nX = len(self.arcs)
+        nV = nY + nX + N
+
+        capacity = np.array([self.instance.capacity[v] for v in vehicles])
+        service = np.array([self.instance.serviceLength[v] for v in vehicles])
+        index = np.array([self.instance.index[label] for label in labels])
+        dist = self.instance.distances[np.ix_(index, index)]  # travel times between graph nodes
+
+        arcs = np.array(list(self.arcs.keys()), dtype=int).reshape(-1, 3)
+        I, J, Kx = arcs[:, 0], arcs[:, 1], arcs[:, 2]
+        M = np.array(list(self.arcs.values()))
+        X = nY + np.arange(nX)  # column of each arc's x
+
+        def col_C(i):
+            return nY + nX + i
+
+        inner = np.arange(1, last)  # graph nodes that are not depots
+        pairs = np.array([i for i in inner if labels[i] == labels[i + 1]], dtype=int)  # visits for the same client
+        pair_of = np.full(N, -1)
+        pair_of[pairs] = np.arange(len(pairs))  # row of each pair, by its first node
+
+        # Add decision variables
+        lb = np.zeros(nV)
+        ub = np.full(nV, GRB.INFINITY)
+        for i in inner:
+            lb[col_C(i)] = self.instance.earliest[labels[i]]
+            ub[col_C(i)] = self.instance.latest[labels[i]]
+        if self.tighten:
+            ub[col_C(0)] = 0  # vehicles leave the depot at time 0
+        vtype = np.array([GRB.BINARY] * (nY + nX) + [GRB.INTEGER] * N)
+        names = [f"y_{cid}" for cid in range(nY)] + \
+                [f"x_{i}_{j}_{k}" for (i, j, k) in self.arcs] + \
+                [f"C_{i}" for i in range(N)]
+        v = model.addMVar(nV, lb=lb, ub=ub, vtype=vtype, name=np.array(names))
+
+        # Add objective function
+        obj = np.zeros(nV)
+        obj[:len(self.instance.demand)] = list(self.instance.demand.values())
+        model.setObjective(obj @ v, GRB.MAXIMIZE)
+
+        # Add constraints
+        # Starting and Ending Location of a tour (22)
+        a = I == 0
+        self.add_matrix_constrs(model, v, Kx[a], X[a], 1, GRB.EQUAL, np.ones(K),
+                                [f"Departure_from_{0}_vehicle_{k}" for k in range(K)])
+        a = J == last
+        self.add_matrix_constrs(model, v, Kx[a], X[a], 1, GRB.EQUAL, np.ones(K),
+                                [f"Arrival_to_{last}_vehicle_{k}" for k in range(K)])
+
+        # Flow conservation (23), one row per (i, k); self loops only count as outgoing flow
+        into = (J != last) & (I != J)
+        out = (I != 0)
+        self.add_matrix_constrs(model, v, [(J[into] - 1) * K + Kx[into], (I[out] - 1) * K + Kx[out]],
+                                [X[into], X[out]], [1, -1], GRB.EQUAL, np.zeros(len(inner) * K),
+                                [f"Flow_Conservation_in_node_{i}_vehicle_{k}" for i in inner for k in range(K)])
+
+        # Number of times a delivery can be made (at most once) (24)
+        self.add_matrix_constrs(model, v, I[out] - 1, X[out], 1, GRB.LESS_EQUAL, np.ones(len(inner)),
+                                [f"At_most_one_visit_from_node_{i}" for i in inner])
+
+        # Deliveries order (25)
+        a = (I != 0) & (pair_of[I - 1] >= 0)  # leaving the second node of a pair
+        b = pair_of[I] >= 0  # leaving the first node of a pair
+        self.add_matrix_constrs(model, v, [pair_of[I[a] - 1], pair_of[I[b]]], [X[a], X[b]], [1, -1],
+                                GRB.LESS_EQUAL, np.zeros(len(pairs)),
+                                [f"Deliver_at_node_{i + 1}_cannot_be_performed_if_at_{i}_hasn't" for i in pairs])
+
+        # Cover customer demands, according the capacity of vehicles (26)
+        customer_of = {label: c for c, label in enumerate(self.instance.demand)}
+        owner = np.array([customer_of.get(label, -1) for label in labels])  # customer row of each graph node
+        a = (I != 0) & (owner[I] >= 0)
+        demand = np.array(list(self.instance.demand.values()))
+        self.add_matrix_constrs(model, v, [owner[I[a]], np.arange(len(demand))], [X[a], np.arange(len(demand))],
+                                [capacity[Kx[a]], -demand], GRB.GREATER_EQUAL, np.zeros(len(demand)),
+                                [f"Covering_customer_{c}" for c in range(len(demand))])
+
+        # Time Consistency
+        # (27), one row per arc leaving a delivery: C[i] - C[j] + M x[i, j, k] <= M - service - distance
+        rows = np.arange(out.sum())
+        self.add_matrix_constrs(model, v, [rows, rows, rows], [col_C(I[out]), col_C(J[out]), X[out]],
+                                [1, -1, M[out]], GRB.LESS_EQUAL,
+                                M[out] - service[Kx[out]] - dist[I[out], J[out]],
+                                [f"Time_Consistency_traveling_from_{i}_to_{j}_with_vehicle_{k}"
+                                 for (i, j, k) in arcs[out].tolist()])
+
+        # (28)
+        a = I == 0
+        rows = np.arange(a.sum())
+        self.add_matrix_constrs(model, v, [rows, rows, rows], [col_C(I[a]), col_C(J[a]), X[a]],
+                                [1, -1, M[a]], GRB.LESS_EQUAL, M[a] - self.release[Kx[a], J[a]],
+                                [f"Time_Consistency_traveling_from_depot_to_{j}_with_vehicle_{k}"
+                                 for (i, j, k) in arcs[a].tolist()])
+
+        # Lower Time Window (29)
+        self.add_matrix_constrs(model, v, [inner - 1, I[out] - 1], [col_C(inner), X[out]],
+                                [1, -service[Kx[out]]], GRB.GREATER_EQUAL,
+                                np.array([self.instance.earliest[labels[i]] for i in inner]),
+                                [f"Ending_time_visit_{i}_later_than_init_tw" for i in inner])
+
+        # Maximum time lag (30) and no overlap for the same customer (31) share their left hand side
+        a = pair_of[J - 1] >= 0  # entering the second node of a pair
+        rows = [np.arange(len(pairs)), np.arange(len(pairs)), pair_of[J[a] - 1]]
+        cols = [col_C(pairs + 1), col_C(pairs), X[a]]
+        vals = [1, -1, -service[Kx[a]]]
+        self.add_matrix_constrs(model, v, rows, cols, vals, GRB.LESS_EQUAL, np.full(len(pairs), self.instance.maxLag),
+                                [f"Consecutive_deliveries_{i}_and_{i + 1}_not_exceeding_customer_lag" for i in pairs])
+        self.add_matrix_constrs(model, v, rows, cols, vals, GRB.GREATER_EQUAL, np.zeros(len(pairs)),
+                                [f"Delivery_{i}_to_{i + 1}_of_same_customer_not_overlapping" for i in pairs])
+
+        # Identical vehicles (32): ordered by the first graph node they visit
+        first = np.full(K, -1)  # row where a vehicle is the first of its twin pair
+        second = np.full(K, -1)
+        for row, (prev, k) in enumerate(self.twins):
+            first[prev] = row
+            second[k] = row
+        a = (I == 0) & (first[Kx] >= 0)
+        b = (I == 0) & (second[Kx] >= 0)
+        self.add_matrix_constrs(model, v, [first[Kx[a]], second[Kx[b]]], [X[a], X[b]], [J[a], -J[b]],
+                                GRB.LESS_EQUAL, np.zeros(len(self.twins)),
+                                [f"Identical_vehicles_{prev}_and_{k}_in_order" for prev, k in self.twins])
+
+        # Keep the same per-index access as build_loops() for reporting
+        variables = v.tolist()
+        y = {cid: variables[cid] for cid in range(nY)}
+        x = {arc: variables[col] for arc, col in zip(self.arcs, X.tolist())}
+        C = {i: variables[col_C(i)] for i in range(N)}
+        return y, x, C
+
+    def add_matrix_constrs(self, model, v, rows, cols, vals, sense, rhs, names):
+        # rows/cols/vals may be arrays or lists of arrays (one per term); duplicates are summed, zeros dropped
+        if not isinstance(rows, list):
+            rows, cols, vals = [rows], [cols], [vals]
+        r = np.concatenate([np.ravel(a) for a in rows])
+        c = np.concatenate([np.ravel(a) for a in cols])
+        d = np.concatenate([np.ravel(np.broadcast_to(val, np.shape(row)))
+                            for row, val in zip(rows, vals)]).astype(float)
+        A = sp.csr_matrix((d, (r, c)), shape=(len(rhs), v.shape[0]))
+        A.eliminate_zeros()
+        return model.addMConstr(A, v, sense, np.asarray(rhs, dtype=float), name=names)
+
+    def init_arcs(self):
+        # Arcs (i, j, k) that get an x variable, with the big-M of their time consistency constraint.
+        # Untightened, that is every arc not leaving the final depot nor returning to the initial one, with M = self.M.
+        # Tightened, M is the smallest value that deactivates (27)/(28) given the bounds of C, arcs that can
+        # never be used are dropped, and identical vehicles are paired for symmetry breaking (32).
+        N = len(self.graphNodes)
+        last = N - 1
+        labels = [self.graphNodes[i] for i in range(N)]
+        vehicles = self.vehicles
+        K = len(vehicles)
+
+        index = np.array([self.instance.index[label] for label in labels])
+        origins = np.array([self.instance.index[self.origin[v][0]] for v in vehicles], dtype=int)
+        ready = np.array([self.origin[v][1] for v in vehicles])
+        length = np.array([self.instance.serviceLength[v] for v in vehicles])
+        delivery = (np.arange(N) > 0) & (np.arange(N) < last)  # the final depot has no service
+        # like (27), the first delivery completes after the travel and its service, not as soon as the vehicle arrives
+        self.release = ready[:, np.newaxis] + self.instance.distances[np.ix_(origins, index)] + \
+            length[:, np.newaxis] * delivery[np.newaxis, :]
+
+        keep = np.ones((K, N, N), dtype=bool)
+        keep[:, last, :] = False  # not leaving from final depot
+        keep[:, :, 0] = False  # not returning to the initial depot
+        if not self.tighten:
+            M = np.full((K, N, N), float(self.M))
+        else:
+            dist = self.instance.distances[np.ix_(index, index)][np.newaxis, :, :]
+            service = np.array([self.instance.serviceLength[v] for v in vehicles])[:, np.newaxis, np.newaxis]
+            lower = np.zeros(N)  # bounds of C; C[0] is fixed at 0 and C[last] has no upper bound
+            upper = np.zeros(N)
+            for i in range(1, last):
+                lower[i] = self.instance.earliest[labels[i]]
+                upper[i] = self.instance.latest[labels[i]]
+            upper[last] = math.inf
+
+            # (27) C[i] - C[j] <= M - service - distance must hold for any C when x[i, j, k] = 0
+            M = upper[np.newaxis, :, np.newaxis] - lower[np.newaxis, np.newaxis, :] + service + dist
+            # (28) C[0] - C[j] <= M - release, with C[0] = 0
+            M[:, 0, :] = self.release - lower[np.newaxis, :]
+
+            # With x[i, j, k] = 1, (29) gives C[i] >= earliest[i] + service and (27) then
+            # C[j] >= C[i] + service + distance, which must fit before latest[j]
+            reach = lower[np.newaxis, :, np.newaxis] + 2 * service + dist <= upper[np.newaxis, np.newaxis, :]
+            keep[:, 1:last, :] &= reach[:, 1:last, :]
+            keep[:, 0, :] &= self.release <= upper[np.newaxis, :]  # (28)
+            keep[:, np.arange(N), np.arange(N)] = False  # a node cannot precede itself (service takes time)
+
+            # Copies of a customer are served in order, (25) and (31), so no vehicle goes back to an earlier copy.
+            # Going on to the next copy, the round trip through a station has to fit within the lag (30)
+            same = np.array(labels)[:, np.newaxis] == np.array(labels)[np.newaxis, :]
+            keep[:, same & (np.arange(N)[:, np.newaxis] > np.arange(N)[np.newaxis, :])] = False
+            keep[:, same & (np.arange(N)[:, np.newaxis] + 1 == np.arange(N)[np.newaxis, :]) &
+                    (dist[0] > self.instance.maxLag)] = False
+
+            classes = dict()  # (capacity, service length, origin) -> last vehicle seen of that class
+            for k, v in enumerate(vehicles):
+                key = (self.instance.capacity[v], self.instance.serviceLength[v], self.origin[v])
+                if key in classes:
+                    self.twins.append((classes[key], k))
+                classes[key] = k
+
+        for k, i, j in np.argwhere(keep).tolist():  # (k, i, j) order, as the variables are created
+            self.arcs[i, j, k] = float(M[k, i, j])
+
+        self.outgoing = {(i, k): [] for i in range(N) for k in range(K)}
+        self.incoming = {(j, k): [] for j in range(N) for k in range(K)}
+        for (i, j, k) in self.arcs:
+            self.outgoing[i, k].append(j)
+            self.incoming[j, k].append(i)
 
     def init_graph(self):
         # Add the nodes
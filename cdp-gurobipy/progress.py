@@ -0,0 +1,94 @@
+import csv
+import json
+
+from gurobipy import GRB
+
+FIELDS = ['time', 'event', 'incumbent', 'bound', 'gap', 'nodes', 'solution']
+
+
+class Progress:
+    # Gurobi callback recording the course of a branch and bound: incumbent, best bound, gap and explored nodes
+    # over time. MIPSOL (new solution) events are always kept; MIP (periodic) events only when the incumbent or
+    # the bound moved, or every interval seconds, so long runs do not pile up millions of identical rows.
+    # The solution column is the objective of the MIPSOL solution: it is not the incumbent yet, and with lazy
+    # constraints (e.g. the CVRP capacity cuts) it may still be rejected
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.events = []  # [(time, event, incumbent, bound, gap, nodes, solution), ...], None for missing values
+
+    def __call__(self, model, where):
+        if where == GRB.Callback.MIP:
+            incumbent = model.cbGet(GRB.Callback.MIP_OBJBST)
+            bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            nodes = model.cbGet(GRB.Callback.MIP_NODCNT)
+            solution = None
+            event = 'MIP'
+        elif where == GRB.Callback.MIPSOL:
+            incumbent = model.cbGet(GRB.Callback.MIPSOL_OBJBST)
+            solution = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+            bound = model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+            nodes = model.cbGet(GRB.Callback.MIPSOL_NODCNT)
+            event = 'MIPSOL'
+        else:
+            return
+        elapsed = model.cbGet(GRB.Callback.RUNTIME)
+        if abs(incumbent) >= GRB.INFINITY:
+            incumbent = None
+        if abs(bound) >= GRB.INFINITY:
+            bound = None
+
+        if event == 'MIP' and self.events:
+            last = self.events[-1]
+            if (incumbent, bound) == (last[2], last[3]) and elapsed - last[0] < self.interval:
+                return
+        self.events.append((elapsed, event, incumbent, bound, gap(incumbent, bound), int(nodes), solution))
+
+    def finish(self, model):
+        # Final state once optimize() returns, which no callback event reports
+        incumbent = model.ObjVal if model.SolCount > 0 else None
+        bound = model.ObjBound if abs(model.ObjBound) < GRB.INFINITY else None
+        self.events.append((model.Runtime, 'END', incumbent, bound, gap(incumbent, bound), int(model.NodeCount),
+                            None))
+
+    def time_to_target(self, target):
+        # First time the gap got down to target (e.g. 0.01), None if it never did
+        return next((e[0] for e in self.events if e[4] is not None and e[4] <= target), None)
+
+    def primal_integral(self, reference=None, end=None):
+        # Integral over time of the primal gap |reference - incumbent| / max(|reference|, |incumbent|), 1 while
+        # there is no incumbent. reference defaults to the final incumbent, end to the last event
+        incumbents = [(e[0], e[2]) for e in self.events if e[2] is not None]
+        if reference is None:
+            if not incumbents:
+                return None
+            reference = incumbents[-1][1]
+        end = self.events[-1][0] if end is None else end
+        total, since, current = 0.0, 0.0, 1.0
+        for t, value in incumbents:
+            total += current * (min(t, end) - since)
+            since = min(t, end)
+            scale = max(abs(reference), abs(value))
+            current = abs(reference - value) / scale if scale > 0 else 0.0
+        return total + current * (end - since)
+
+    def rows(self):
+        return [dict(zip(FIELDS, e)) for e in self.events]
+
+    def to_csv(self, filename):
+        with open(filename, 'w', newline='') as f:
+            writer = csv.DictWriter(f, FIELDS)
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def to_json(self, filename, timings=None):
+        # The time series, with the build phase timings (seconds per phase) if given
+        with open(filename, 'w') as f:
+            json.dump({'timings': timings or {}, 'events': self.rows()}, f, indent=2)
+
+
+def gap(incumbent, bound):  # relative MIP gap, as Gurobi reports it
+    if incumbent is None or bound is None:
+        return None
+    if incumbent == 0:
+        return 0.0 if bound == 0 else None
+    return abs(bound - incumbent) / abs(incumbent)
@@ -0,0 +1,100 @@
+import argparse
+
+import gurobipy as gp
+import numpy as np
+
+import instance as i
+import mip_model_solver as mip
+import solution as s
+
+
+def restrict(data, customers):
+    # Instance arrays with only the given customers; every location is kept, so the travel times do not change
+    keep = np.isin(data['customers'], list(customers))
+    sub = dict(data)
+    for name in ('customers', 'demand', 'earliest', 'latest'):
+        sub[name] = data[name][keep]
+    return sub
+
+
+class RollingHorizonSolver:
+    # Solves the day block by block: each block is a MIP over the customers whose window opens within it (plus an
+    # overlap looking ahead), with the vehicles where and when the committed deliveries leave them. Only the
+    # customers of the block itself are committed, those of the overlap are planned again with the next block
+    def __init__(self, instance, length=120, overlap=60, tighten=True, matrix=True):
+        self.instance = instance
+        self.length = length  # minutes of window openings committed per block
+        self.overlap = overlap  # minutes looked ahead past the block
+        self.tighten = tighten
+        self.matrix = matrix
+        self.blocks = []  # one row per block: (begin, customers, committed, status, served tons, runtime)
+
+    def solve(self, params=None, env=None, verbose=True):
+        # The stitched schedule as a Solution of the whole instance. params (e.g. {'TimeLimit': 30}) apply to
+        # every block, which bounds the time of each step
+        solution = s.Solution(self.instance)
+        remaining = set(self.instance.customers)  # customers not committed yet
+        first = min(self.instance.earliest.values())
+        last = max(self.instance.earliest.values())
+        for begin in range(first, last + 1, self.length):
+            end = begin + self.length
+            # customers opening before the end of the overlap that some vehicle can still reach in time
+            customers = [c for c in self.instance.demand if c in remaining and
+                         self.instance.earliest[c] < end + self.overlap and solution.window(c) is not None]
+            if not customers:
+                continue
+            core = {c for c in customers if self.instance.earliest[c] < end}
+
+            origin = {v: (solution.position[v], solution.times[v]) for v in solution.position}
+            solver = mip.MIPSolver(i.Instance(None, data=restrict(self.instance.data, customers)),
+                                   tighten=self.tighten, origin=origin)
+            solver.build(matrix=self.matrix, env=env)
+            self.hurry(solver)
+            result = solver.solve(params)
+            committed, tons = [], None
+            if result.objective is not None:
+                committed = [c for c in customers if c in core and result.covered[c]]
+                self.commit(solution, solver, result, committed)
+                remaining.difference_update(committed)
+                tons = sum(self.instance.demand[c] for c in customers if result.covered[c])
+            solver.model.dispose()
+
+            self.blocks.append((begin, len(customers), len(committed), result.status, tons, result.runtime))
+            if verbose:
+                print(f'Block from {begin}: {len(committed)} of {len(customers)} customers committed, '
+                      f'{solution.fitness} served tons ({result.runtime:.2f}s)')
+        return solution
+
+    def hurry(self, solver):
+        # Served tons alone leave the deliveries anywhere in their slack, and the vehicles reach the next block later
+        # than needed. A small penalty on the completion times C makes them finish early, small enough that all of
+        # it is worth less than one ton (demands are whole tons)
+        last = len(solver.graphNodes) - 1
+        deliveries = [solver.C[i] for i in range(1, last)]
+        horizon = max(self.instance.latest.values())
+        solver.model.setAttr('Obj', deliveries, [-1 / (len(deliveries) * horizon + 1)] * len(deliveries))
+
+    def commit(self, solution, solver, result, customers):
+        # Replay the deliveries of the given customers on the solution, with the vehicles the block chose.
+        # The deliveries of the other customers are dropped: going straight on is never longer, travel times
+        # satisfy the triangle inequality
+        for start, v, c in result.deliveries(solver):
+            if c in customers:
+                solution.perform(v, c, start, record=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve a CDP instance with a rolling horizon of MIPs')
+    parser.add_argument('filename', nargs='?', default='A_2_5_1.rmc')
+    parser.add_argument('--length', type=int, default=120, help='minutes of window openings per block')
+    parser.add_argument('--overlap', type=int, default=60, help='minutes looked ahead past each block')
+    for name, kind in mip.PARAMETERS.items():
+        parser.add_argument(f'--{name}', type=kind, help='Gurobi parameter, for every block')
+    args = parser.parse_args()
+    params = {name: getattr(args, name) for name in mip.PARAMETERS if getattr(args, name) is not None}
+
+    data = i.Instance(args.filename)
+    best = RollingHorizonSolver(data, args.length, args.overlap).solve(params, env=gp.Env(params={'OutputFlag': 0}))
+    for action in best.actions:
+        print(f' Vehicle {action[0]} visits {action[1]} at time {action[2]} and leaves at time {action[3]}')
+    print(f'Total served tons: {best.fitness}')
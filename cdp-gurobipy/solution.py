@@ -1,10 +1,17 @@
+import numpy as np
+
+
 class Solution:
+    __slots__ = ('instance', 'actions', 'fitness', 'pending', 'position', 'times', 'journal', '_arrival', '_reach',
+                 'stale', 'shared')
+
     def __init__(self, instance):
         self.instance = instance  # problem instance
         self.actions = []  # vehicle visits already included in the solution (list)
+        # [('k0', 'c4', 160, 175), ...] as (vehicle, customer, service start, departure)
         self.fitness = 0  # cumulative
         self.pending = dict()  # pending demands
-        self.position = {p: 'v0' for p in self.instance.vehicles}  # Initialize position of vehicles at depot
+        self.position = {p: 'v0' for p in sorted(self.instance.vehicles)}  # Initialize position of vehicles at depot
         # {'k0': 'v0', 'k1': 'v0'}
         self.times = {v: 0 for v in self.position}  # Times when vehicles departure an act.
         # Default zero for all vehicles and init tw for customers
@@ -14,45 +21,126 @@ class Solution:
             self.pending[c] = self.instance.demand[c]  # default full demand pending
             self.times[c] = self.instance.earliest[c]  # default in the time window init for customers
 
-    def status(self):
-        replica = Solution(self.instance)
+        self.journal = []  # undo records of apply(), see undo()
+
+        # Feasibility index: arrival[row, column] is when vehicle row could reach customer column from where it is
+        # now, reach[column] the earliest of those over the fleet (see Instance.row and Instance.column).
+        # perform() and undo() only mark the vehicle they move as stale; its row, and reach where it changes, are
+        # brought up to date when the index is next read, see refresh()
+        self._arrival = np.empty((len(self.position), len(self.instance.demand)), dtype=int)
+        for v in self.position:
+            self._arrival[self.instance.row[v]] = self.locate(v)
+        self._reach = self._arrival.min(axis=0)
+        self.stale = set()  # vehicles moved since the index was last refreshed
+        self.shared = False  # whether the index arrays are also used by a snapshot, see status()
+
+    @property
+    def arrival(self):
+        self.refresh()
+        return self._arrival
+
+    @property
+    def reach(self):
+        self.refresh()
+        return self._reach
+
+    def locate(self, v):  # arrival times of vehicle v at every customer, from its current position and time
+        origin = self.instance.index[self.position[v]]
+        return self.times[v] + self.instance.distances[origin, self.instance.customerIndex]
+
+    def refresh(self):  # update the rows of the stale vehicles, and reach only in the columns they change
+        if not self.stale:
+            return
+        if self.shared:  # copy on write, the snapshot keeps the arrays as they were
+            self._arrival, self._reach = self._arrival.copy(), self._reach.copy()
+            self.shared = False
+        arrival, reach = self._arrival, self._reach
+        for v in self.stale:
+            row = self.instance.row[v]
+            new = self.locate(v)
+            # columns where v was the earliest vehicle and now comes later: another vehicle may be first there
+            lost = (arrival[row] == reach) & (new > reach)
+            arrival[row] = new
+            np.minimum(reach, new, out=reach)
+            if lost.any():
+                reach[lost] = arrival[:, lost].min(axis=0)
+        self.stale.clear()
+
+    def status(self):  # independent snapshot of the current state (with an empty journal)
+        replica = Solution.__new__(Solution)  # every field is copied below, no need to initialise from the instance
+        replica.instance = self.instance
+        replica.journal = []
         replica.actions = self.actions.copy()
+        replica.fitness = self.fitness
         replica.pending = self.pending.copy()
         replica.times = self.times.copy()
         replica.position = self.position.copy()
+        replica._arrival, replica._reach = self._arrival, self._reach  # shared until either side refreshes
+        replica.stale = self.stale.copy()
+        replica.shared = self.shared = True
         return replica
 
-    def masked(self, a):  # whether an action is no longer available (if a visit cannot be performed)
-        (c, t) = a  # (customer, time) for the action
+    def started(self, c):  # whether customer c already received a delivery
+        return self.pending[c] < self.instance.demand[c]
+
+    def window(self, c):  # (first, last) start times of the next delivery to c that are not masked, None if none
         if self.pending[c] <= 0:
             # demand already satisfied
-            return True
-        if t < self.times[c]:
-            # customer already has actions before time t or action is before tw start
-            return True
-        if t > self.times[c] + self.instance.maxLag:
-            # lag violation for customer
-            return True
-        if t > self.instance.latest[c]:
-            # unable to meet deadline for customer
-            return True
-        # Check masking for vehicles
-        for v in self.position:
-            sl = self.instance.serviceLength[v]
-            pos = self.position[v]
-            # determining masking
-            arrival = self.times[v] + self.instance.distance(pos, c)
-            if t >= arrival + sl or max(arrival, t) <= self.instance.latest[c]:
-                # this can be done
-                return False
-        # no feasible vehicle for customer; this action is masked
-        return True
-
-    def extend(self, c, t):  # given an available action, pick a vehicle
-        delay = 0
+            return None
+        latest = self.instance.latest[c]
+        if self.stale:
+            self.refresh()
+        if self._reach[self.instance.column[c]] > latest:
+            # no vehicle reaches the customer before its deadline
+            return None
+        first = self.times[c]  # not before the previous delivery ends (or the window opens)
+        last = min(latest, first + self.instance.maxLag) if self.started(c) else latest
+        return (first, last) if first <= last else None
+
+    def eligible(self, c):  # vehicles that can reach customer c before its deadline
+        column = self.arrival[:, self.instance.column[c]]
+        return [v for v, a in zip(self.position, column.tolist()) if a <= self.instance.latest[c]]
+
+    def masked(self, a):  # whether an action is no longer available (if a visit cannot be performed)
+        # A vehicle can do (c, t) with t within the deadline when it gets to c by the deadline, whatever t is,
+        # so the test only depends on the window of c, see window()
+        (c, t) = a  # (customer, time) for the action
+        bounds = self.window(c)
+        return bounds is None or not bounds[0] <= t <= bounds[1]
+
+    def candidates(self, starts=None):
+        # Every feasible next delivery (score, customer, time, vehicle) at once, best score first, for RCL selection
+        # in constructions that pick one delivery at a time (the GRASP picks whole customers, see construct()).
+        # Without starts, each vehicle starts at each customer as soon as it can; otherwise starts lists the times to
+        # try for every (customer, vehicle). The score is the tons delivered per minute the vehicle is busy (travel,
+        # waiting and service). Play one with perform(vehicle, customer, time, record=True)
+        instance = self.instance
+        labels = list(instance.column)
+        pending = np.array([self.pending[c] for c in labels])
+        ready = np.array([self.times[c] for c in labels])  # end of the previous delivery (or window start)
+        started = pending < np.array([instance.demand[c] for c in labels])
+        free = np.array([self.times[v] for v in self.position])[:, np.newaxis]  # when each vehicle is done
+        service = instance.serviceArray[:, np.newaxis]
+
+        if starts is None:
+            start = np.maximum(self.arrival, ready)[np.newaxis]  # (1, vehicles, customers)
+        else:
+            start = np.broadcast_to(np.asarray(starts, dtype=int)[:, np.newaxis, np.newaxis],
+                                    (len(starts),) + self.arrival.shape)
+        feasible = ((pending > 0) & (start >= self.arrival) & (start >= ready) &
+                    (start + service <= instance.latestArray) & (~started | (start <= ready + instance.maxLag)))
+
+        served = np.minimum(instance.capacityArray[:, np.newaxis], pending)
+        score = served / np.maximum(start + service - free, 1)
+        n, k, c = np.nonzero(feasible)
+        order = np.argsort(-score[n, k, c], kind='stable')
+        vehicles = list(self.position)
+        return [(s, labels[col], t, vehicles[row]) for s, row, col, t in
+                zip(score[n, k, c][order].tolist(), k[order].tolist(), c[order].tolist(),
+                    start[n, k, c][order].tolist())]
+
+    def vehicle_for(self, c, t):  # first vehicle able to start serving c at time t, and its arrival there
         departure = self.times[c]
-        chosen_veh = None  # chosen vehicle
-        cap_cv = None  # capacity of chosen vehicle
         for (v, pos) in self.position.items():
             vt = self.times[v]
             travel_time = self.instance.distance(pos, c)
@@ -60,30 +148,69 @@ class Solution:
             service_length = self.instance.serviceLength[v]
             if t >= arrival:
                 # there will be a delay
-                delay = t - arrival
                 if max(arrival, t) + service_length <= self.instance.latest[c]:
-                    vcap = self.instance.capacity[v]
-                    if max(arrival, t) <= departure + self.instance.maxLag or c == 'v1':
-                        chosen_veh = v  # use this vehicle
-                        cap_cv = vcap
-                        break
+                    if not self.started(c) or max(arrival, t) <= departure + self.instance.maxLag or c == 'v1':
+                        return v, arrival  # use this vehicle
+        return None, None
 
+    def extend(self, c, t, verbose=True):  # given an available action, pick a vehicle; self is left untouched
+        chosen_veh, arrival = self.vehicle_for(c, t)
         if chosen_veh is None:
-            print(f'No suitable vehicle')
+            if verbose:
+                print(f'No suitable vehicle')
             return None
-
-        chosen_arrival = self.times[chosen_veh] + delay + self.instance.distance(self.position[chosen_veh], c)
-        departure = chosen_arrival + self.instance.serviceLength[chosen_veh]
-        t += self.instance.serviceLength[chosen_veh]
         updated = self.status()
-        updated.times[c] = departure  # update the customer time
-        updated.times[chosen_veh] = departure  # update the vehicle time
-        updated.position[chosen_veh] = c  # update the vehicle position
-        updated.pending[c] -= cap_cv  # update the pending demand
-        if updated.pending[c] <= 0:
+        updated.perform(chosen_veh, c, t, record=False)
+        if verbose:
+            updated.report()
+        return updated
+
+    def apply(self, c, t, verbose=False):
+        # In place version of extend() for search loops: no copies, and the move can be reverted with undo()
+        chosen_veh, arrival = self.vehicle_for(c, t)
+        if chosen_veh is None:
+            return None
+        self.perform(chosen_veh, c, t, record=True)
+        if verbose:
+            self.report()
+        return chosen_veh
+
+    def undo(self):  # revert the last apply(), returns its (customer, time) action
+        v, c, position, vehicle_time, customer_time, pending, fitness = self.journal.pop()
+        start = self.actions.pop()[2]
+        self.position[v] = position
+        self.times[v] = vehicle_time
+        self.times[c] = customer_time
+        self.pending[c] = pending
+        self.fitness = fitness
+        self.stale.add(v)
+        return c, start
+
+    def rollback(self, mark):  # undo every apply() after the journal had length mark; returns them in apply order
+        undone = []
+        while len(self.journal) > mark:
+            undone.append(self.undo())
+        undone.reverse()
+        return undone
+
+    def perform(self, chosen_veh, c, t, record):
+        # chosen_veh starts serving c at time t (it waits there if it arrives earlier)
+        if record:
+            self.journal.append((chosen_veh, c, self.position[chosen_veh], self.times[chosen_veh], self.times[c],
+                                 self.pending[c], self.fitness))
+        departure = t + self.instance.serviceLength[chosen_veh]
+        self.times[c] = departure  # update the customer time
+        self.times[chosen_veh] = departure  # update the vehicle time
+        self.position[chosen_veh] = c  # update the vehicle position
+        self.pending[c] -= self.instance.capacity[chosen_veh]  # update the pending demand
+        self.actions.append((chosen_veh, c, t, departure))  # record the visit
+        self.stale.add(chosen_veh)
+        if self.pending[c] <= 0 < self.pending[c] + self.instance.capacity[chosen_veh]:
             # service completed
-            updated.fitness += self.instance.demand[c]
+            self.fitness += self.instance.demand[c]
+
+    def report(self):  # print the last visit
+        (chosen_veh, c, start, departure) = self.actions[-1]
         print(f' Vehicle {chosen_veh} ' + \
               f'visits {c} ' + \
-              f'at time {t} and leaves at time {departure}')
-        return updated
+              f'at time {start} and leaves at time {departure}')
@@ -0,0 +1,105 @@
+import argparse
+import csv
+import glob
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import gurobipy as gp
+from gurobipy import GRB
+
+import instance as i
+import mip_model_solver as mip
+
+# Values tried for each Gurobi parameter; Threads, TimeLimit and Seed are set by the driver itself
+SPACE = {
+    'MIPFocus': [0, 1, 2, 3],
+    'Cuts': [-1, 0, 1, 2],
+    'Heuristics': [0.05, 0.2, 0.5],
+    'Presolve': [-1, 2],
+    'Symmetry': [-1, 2],
+}
+FIELDS = ['config', 'instance', 'seed', 'status', 'objective', 'bound', 'gap', 'runtime', 'params']
+
+env = None  # quiet Gurobi environment of each worker process
+
+
+def configurations(space, samples=None, seed=0):
+    # Every combination of the space (grid search), or samples of them drawn at random without repetition
+    names = sorted(space)
+    grid = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    if samples is None or samples >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, samples)
+
+
+def run(n, filename, params):
+    # One solve in a worker process, as a row of the results
+    global env
+    if env is None:
+        env = gp.Env(params={'OutputFlag': 0})
+    solver = mip.MIPSolver(i.Instance(filename))
+    solver.build(matrix=True, env=env)
+    result = solver.solve(params)
+    row = {'config': n, 'instance': os.path.basename(filename), 'seed': params['Seed'], 'status': result.status,
+           'objective': result.objective, 'bound': result.bound, 'gap': result.gap, 'runtime': result.runtime,
+           'params': params}
+    solver.model.dispose()
+    return row
+
+
+def score(rows, time_limit, metric):
+    # Lower is better. 'time': mean time to optimality, unsolved runs counting twice the time limit (PAR2);
+    # 'gap': mean final gap, runs without a solution counting as 1
+    if metric == 'time':
+        return sum(r['runtime'] if r['status'] == GRB.OPTIMAL else 2 * time_limit for r in rows) / len(rows)
+    return sum(1.0 if r['gap'] is None else min(r['gap'], 1.0) for r in rows) / len(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Search Gurobi parameters for the CDP MIP over a set of instances')
+    parser.add_argument('instances', nargs='+', help='.rmc files or folders of them')
+    parser.add_argument('--samples', type=int, help='configurations drawn at random (default: the whole grid)')
+    parser.add_argument('--seeds', type=int, default=1, help='runs per configuration and instance, Seed 0, 1, ...')
+    parser.add_argument('--time-limit', type=float, default=60)
+    parser.add_argument('--threads', type=int, default=os.cpu_count(), help='total thread budget')
+    parser.add_argument('--workers', type=int, help='solves at once (default: the thread budget, one thread each)')
+    parser.add_argument('--metric', choices=['time', 'gap'], default='time')
+    parser.add_argument('--seed', type=int, default=0, help='for the random sample of configurations')
+    parser.add_argument('--output', default='tuning.csv')
+    args = parser.parse_args()
+
+    files = []
+    for path in args.instances:
+        files += sorted(glob.glob(os.path.join(path, '*.rmc'))) if os.path.isdir(path) else [path]
+    for filename in files:
+        i.Instance(filename)  # fill the binary caches once, not in every worker at the same time
+
+    # Split the thread budget between concurrent solves, so that the machine is never oversubscribed
+    workers = args.workers or args.threads
+    threads = max(1, args.threads // workers)
+    configs = configurations(SPACE, args.samples, args.seed)
+    print(f'{len(configs)} configurations x {len(files)} instances x {args.seeds} seeds, '
+          f'{workers} workers with {threads} threads each')
+
+    rows = []
+    with open(args.output, 'w', newline='') as f, ProcessPoolExecutor(workers) as pool:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        runs = [pool.submit(run, n, filename, dict(config, Threads=threads, TimeLimit=args.time_limit, Seed=seed))
+                for n, config in enumerate(configs) for filename in files for seed in range(args.seeds)]
+        for done in as_completed(runs):
+            row = done.result()
+            rows.append(row)
+            writer.writerow(row)
+            f.flush()
+
+    ranking = sorted(range(len(configs)),
+                     key=lambda n: score([r for r in rows if r['config'] == n], args.time_limit, args.metric))
+    for n in ranking[:5]:
+        mine = [r for r in rows if r['config'] == n]
+        solved = sum(r['status'] == GRB.OPTIMAL for r in mine)
+        print(f'{configs[n]}: {args.metric} score {score(mine, args.time_limit, args.metric):.4g}, '
+              f'{solved}/{len(mine)} solved to optimality')
+    print(f'Best configuration: {configs[ranking[0]]} (all runs in {args.output})')
@@ -0,0 +1,63 @@
+import argparse
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gurobipy import GRB
+
+import cvrplib
+import main
+
+FIELDS = ['instance', 'n', 'k', 'formulation', 'status', 'objective', 'bound', 'gap', 'wall_time']
+STATUS = {GRB.OPTIMAL: 'optimal', GRB.TIME_LIMIT: 'time_limit', GRB.INFEASIBLE: 'infeasible',
+          GRB.INTERRUPTED: 'interrupted'}
+
+
+def run(filename, formulation, time_limit, threads):
+    # Solve one instance in a worker process and return its CSV row
+    start = time.perf_counter()
+    row = {'instance': os.path.basename(filename), 'formulation': formulation}
+    try:
+        data = cvrplib.Instance(filename)
+        row['n'], row['k'] = data.n, data.k
+        params = {'OutputFlag': 0, 'Threads': threads}
+        if time_limit is not None:
+            params['TimeLimit'] = time_limit
+        model, x = main.solve(formulation, data.n, data.k, data.Q, data.C, data.d, params)
+        row['status'] = STATUS.get(model.status, str(model.status))
+        if model.SolCount > 0:
+            row['objective'] = model.ObjVal
+            row['gap'] = model.MIPGap
+        row['bound'] = model.ObjBound
+        model.dispose()
+    except Exception as e:  # one broken instance must not stop the whole batch
+        row['status'] = f'error: {e}'
+    row['wall_time'] = round(time.perf_counter() - start, 3)
+    return row
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve every CVRPLIB .vrp file of a directory')
+    parser.add_argument('directory')
+    parser.add_argument('--formulation', default='two-index', choices=main.FORMULATIONS)
+    parser.add_argument('--time-limit', type=float, default=60, help='seconds per instance')
+    parser.add_argument('--threads', type=int, default=1, help='Gurobi threads per instance')
+    parser.add_argument('--workers', type=int, help='instances solved at once (default: cores / threads)')
+    parser.add_argument('--output', default='results.csv')
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.directory, '*.vrp')))
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads)  # do not oversubscribe the cores
+    print(f'Solving {len(files)} instances with {workers} workers')
+
+    with open(args.output, 'w', newline='') as f, ProcessPoolExecutor(workers) as pool:
+        writer = csv.DictWriter(f, FIELDS)
+        writer.writeheader()
+        runs = [pool.submit(run, filename, args.formulation, args.time_limit, args.threads) for filename in files]
+        for done in as_completed(runs):
+            row = done.result()
+            writer.writerow(row)
+            f.flush()  # keep finished rows even if the batch is interrupted
+            print(f"{row['instance']}: {row['status']}, objective {row.get('objective')} ({row['wall_time']}s)")
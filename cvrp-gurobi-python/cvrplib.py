@@ -0,0 +1,75 @@
+import math
+import re
+
+import numpy as np
+
+
+class Instance():
+    # A CVRPLIB (TSPLIB format) .vrp instance, with the depot moved to node 0
+    def __init__(self, filename):
+        print(f'Parsing instance from {filename}')
+
+        self.name = None
+        self.n = None  # number of nodes, depot included
+        self.k = None  # number of vehicles
+        self.Q = None  # demand of each node (list)
+        self.C = None  # capacity of each vehicle
+        self.d = None  # distance matrix (numpy)
+        self.coordinates = None  # node coordinates (numpy), in the same order as Q and d
+
+        spec = dict()
+        coordinates, demand, depots = dict(), dict(), []
+        section = None
+        with open(filename) as lines:
+            for line in lines:
+                fields = line.split()
+                if not fields:
+                    continue
+                if fields[0] == 'EOF':
+                    break
+                if fields[0].endswith('_SECTION'):
+                    section = fields[0]
+                    continue
+                if re.match(r'^\s*[A-Z_]+\s*:', line):  # specification part, 'KEY : value'
+                    key, value = line.split(':', 1)
+                    spec[key.strip()] = value.strip()
+                    section = None
+                elif section == 'NODE_COORD_SECTION':
+                    coordinates[int(fields[0])] = (float(fields[1]), float(fields[2]))
+                elif section == 'DEMAND_SECTION':
+                    demand[int(fields[0])] = int(fields[1])
+                elif section == 'DEPOT_SECTION':
+                    if int(fields[0]) >= 0:  # the list ends with -1
+                        depots.append(int(fields[0]))
+
+        self.name = spec.get('NAME', filename)
+        self.n = int(spec['DIMENSION'])
+        self.C = int(spec['CAPACITY'])
+        depot = depots[0] if depots else min(coordinates)
+        order = [depot] + [i for i in sorted(coordinates) if i != depot]
+        assert len(order) == self.n
+        self.Q = [demand.get(i, 0) for i in order]
+        self.coordinates = np.array([coordinates[i] for i in order])
+        self.d = distance_matrix(self.coordinates, spec.get('EDGE_WEIGHT_TYPE', 'EUC_2D'))
+
+        # Fleet size: explicit, from the usual '-k<trucks>' name suffix, or the minimum the demand requires
+        trucks = re.search(r'-k(\d+)', self.name)
+        if 'VEHICLES' in spec:
+            self.k = int(spec['VEHICLES'])
+        elif trucks:
+            self.k = int(trucks.group(1))
+        else:
+            self.k = math.ceil(sum(self.Q) / self.C)
+
+
+def distance_matrix(points, weight_type='EUC_2D'):
+    # All pairwise distances at once, rounded as TSPLIB prescribes for the weight type
+    delta = points[:, np.newaxis, :] - points[np.newaxis, :, :]
+    exact = np.sqrt((delta ** 2).sum(axis=2))
+    if weight_type == 'EUC_2D':
+        return np.floor(exact + 0.5).astype(int)  # nearest integer
+    if weight_type == 'CEIL_2D':
+        return np.ceil(exact).astype(int)
+    if weight_type == 'EXACT_2D':
+        return exact
+    raise ValueError(f'Unsupported EDGE_WEIGHT_TYPE {weight_type}')
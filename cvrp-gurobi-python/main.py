@@ -1,9 +1,15 @@
+import argparse
+import math
 import sys
+import time
 
 import gurobipy as gp
 from gurobipy import GRB
 
-# Define problem data
+import cvrplib
+import progress as pg
+
+# Define problem data (a toy example; benchmark instances are read with cvrplib.Instance)
 n = 6  # number of customers
 k = 2  # number of vehicles
 Q = [0, 10, 20, 30, 40, 50]  # demand of each customer
@@ -17,80 +23,238 @@ d = [[0, 5, 10, 20, 25, 30],
      [30, 20, 25, 20, 10, 0]]  # distance matrix
 M = sys.maxsize
 
-# Create a new Gurobi model
-model = gp.Model()
 
-# Add decision variables
-x = {}
-for v in range(1, k + 1):
+def build_mtz(n, k, Q, C, d):
+    # Per-vehicle (three-index) formulation, subtours eliminated by MTZ load constraints
+    # Create a new Gurobi model
+    model = gp.Model()
+
+    # Add decision variables
+    x = {}
+    for v in range(1, k + 1):
+        for i in range(n):
+            for j in range(n):
+                if i != j:
+                    x[v, i, j] = model.addVar(vtype=GRB.BINARY, name=f"vehicle_{v}_arc_{i}_{j}")
+
+    u = {}
+    for v in range(1, k + 1):
+        for i in range(n):
+            u[v, i] = model.addVar(vtype=GRB.INTEGER, name=f"vehicle_{v}_node_{i}")
+
+    # Add objective function
+    model.setObjective(
+        gp.quicksum(d[i][j] * x[v, i, j] for v in range(1, k + 1) for i in range(n) for j in range(n) if i != j),
+        GRB.MINIMIZE)
+
+    # Add constraints
+    # First two constraints ensure all nodes must be visited only once,
+    # (customers can only be serviced by one vehicle)
+
+    #   Outflow node i only once
+    for i in range(1, n):
+        model.addConstr(gp.quicksum(x[v, i, j] for v in range(1, k + 1) for j in range(n) if i != j) == 1)
+
+    #   Inflow node j only once
+    for j in range(1, n):
+        model.addConstr(gp.quicksum(x[v, i, j] for v in range(1, k + 1) for i in range(n) if i != j) == 1)
+
+    # Flow Conservation
+    for i in range(1, n):
+        for v in range(1, k + 1):
+            model.addConstr(gp.quicksum(x[v, i, j] for j in range(n) if i != j) -
+                            gp.quicksum(x[v, j, i] for j in range(n) if i != j) == 0, name="Flow_Conservation")
+
+    for v in range(1, k + 1):
+        # Capacity Constraint
+        model.addConstr(gp.quicksum(Q[i] * x[v, i, j] for i in range(n) for j in range(n) if i != j) <= C,
+                        name=f"Vehicle_{v}_Capacity")
+
+        # All routes must start and finish at the same depot after servicing the customers
+        model.addConstr(gp.quicksum(x[v, 0, j] for j in range(1, n)) -
+                        gp.quicksum(x[v, j, 0] for j in range(1, n)) <= 1, name=f"Vehicle_{v}_Start_and_Finish_at_depot")
+
+    # SubTour Elimination Constraints
+    for i in range(1, n):
+        for j in range(1, n):
+            if i != j:
+                for v in range(1, k + 1):
+                    model.addConstr(u[v, j] - u[v, i] + C * (1 - x[v, i, j]) >= Q[j])
+
+    for i in range(1, n):
+        for v in range(1, k + 1):
+            model.addConstr(u[v, i] >= Q[i])
+            model.addConstr(u[v, i] <= C)
+
+    model._callback = None
+    return model, x
+
+
+def print_mtz(model, x, n, k, d):
+    # Print the solution
+    if model.status == GRB.OPTIMAL:
+        print("Optimal solution found")
+        for v in range(1, k + 1):
+            print(f"Vehicle {v}:")
+            for i in range(n):
+                for j in range(n):
+                    if i != j and x[v, i, j].x > 0.5:
+                        print(f"  Customer {i} to {j} ({d[i][j]} km)")
+        print(f"Total distance: {model.objVal:.2f} km")
+    else:
+        print("No feasible solution found")
+
+
+def components(n, arcs):
+    # Connected components of the customers (the depot removed) in the graph of the given arcs
+    neighbours = {i: set() for i in range(1, n)}
+    for (i, j) in arcs:
+        if i != 0 and j != 0:
+            neighbours[i].add(j)
+            neighbours[j].add(i)
+    seen = set()
+    for i in range(1, n):
+        if i in seen:
+            continue
+        component, stack = {i}, [i]
+        while stack:
+            for j in neighbours[stack.pop()] - component:
+                component.add(j)
+                stack.append(j)
+        seen |= component
+        yield component
+
+
+def capacity_cuts(model, where):
+    # Lazy rounded capacity cuts on integer solutions: every component S of customers must be left at least
+    # ceil(Q(S) / C) times. This cuts off subtours (not left at all) and overloaded routes alike.
+    if where != GRB.Callback.MIPSOL:
+        return
+    n, Q, C = model._data
+    values = dict(zip(model._arcs, model.cbGetSolution(list(model._x.values()))))
+    for S in components(n, [a for a, val in values.items() if val > 0.5]):
+        need = max(1, math.ceil(sum(Q[i] for i in S) / C))
+        leaving = [(i, j) for i in S for j in range(n) if j not in S]
+        if sum(values[a] for a in leaving) < need - 0.5:
+            model.cbLazy(gp.quicksum(model._x[a] for a in leaving) >= need)
+
+
+def build_two_index(n, k, Q, C, d):
+    # Vehicle-aggregated (two-index) formulation: no per-vehicle symmetry, and capacity/subtour constraints are
+    # only added when an integer solution violates them (capacity_cuts)
+    model = gp.Model()
+
+    # Add decision variables
+    x = {}  # whether some vehicle travels from i to j
     for i in range(n):
         for j in range(n):
             if i != j:
-                x[v, i, j] = model.addVar(vtype=GRB.BINARY, name=f"vehicle_{v}_arc_{i}_{j}")
+                x[i, j] = model.addVar(vtype=GRB.BINARY, name=f"arc_{i}_{j}")
 
-u = {}
-for v in range(1, k + 1):
-    for i in range(n):
-        u[v, i] = model.addVar(vtype=GRB.INTEGER, name=f"vehicle_{v}_node_{i}")
+    # Add objective function
+    model.setObjective(gp.quicksum(d[i][j] * x[i, j] for (i, j) in x), GRB.MINIMIZE)
 
-# Add objective function
-model.setObjective(
-    gp.quicksum(d[i][j] * x[v, i, j] for v in range(1, k + 1) for i in range(n) for j in range(n) if i != j),
-    GRB.MINIMIZE)
+    # Add constraints
+    # Every customer is entered and left exactly once
+    for i in range(1, n):
+        model.addConstr(gp.quicksum(x[i, j] for j in range(n) if i != j) == 1, name=f"Outflow_{i}")
+        model.addConstr(gp.quicksum(x[j, i] for j in range(n) if i != j) == 1, name=f"Inflow_{i}")
 
-# Add constraints
-# First two constraints ensure all nodes must be visited only once,
-# (customers can only be serviced by one vehicle)
+    # At most k routes, all of them starting and finishing at the depot
+    model.addConstr(gp.quicksum(x[0, j] for j in range(1, n)) <= k, name="Fleet_size")
+    model.addConstr(gp.quicksum(x[0, j] for j in range(1, n)) ==
+                    gp.quicksum(x[j, 0] for j in range(1, n)), name="Start_and_Finish_at_depot")
 
-#   Outflow node i only once
-for i in range(1, n):
-    model.addConstr(gp.quicksum(x[v, i, j] for v in range(1, k + 1) for j in range(n) if i != j) == 1)
+    # Capacity/subtour cuts are separated lazily while optimizing
+    model._x = x
+    model._arcs = list(x.keys())
+    model._data = (n, Q, C)
+    model._callback = capacity_cuts
+    model.Params.LazyConstraints = 1
+    return model, x
 
-#   Inflow node j only once
-for j in range(1, n):
-    model.addConstr(gp.quicksum(x[v, i, j] for v in range(1, k + 1) for i in range(n) if i != j) == 1)
 
-# Flow Conservation
-for i in range(1, n):
-    for v in range(1, k + 1):
-        model.addConstr(gp.quicksum(x[v, i, j] for j in range(n) if i != j) -
-                        gp.quicksum(x[v, j, i] for j in range(n) if i != j) == 0, name="Flow_Conservation")
+def print_two_index(model, x, n, k, d):
+    # Print the solution
+    if model.SolCount > 0:
+        print("Optimal solution found" if model.status == GRB.OPTIMAL else "Feasible solution found")
+        successor = {i: j for (i, j) in x if x[i, j].x > 0.5}
+        for r, first in enumerate(j for (i, j) in x if i == 0 and x[i, j].x > 0.5):
+            print(f"Route {r + 1}:")
+            i, j = 0, first
+            while True:
+                print(f"  Customer {i} to {j} ({d[i][j]} km)")
+                if j == 0:
+                    break
+                i, j = j, successor[j]
+        print(f"Total distance: {model.objVal:.2f} km")
+    else:
+        print("No feasible solution found")
 
-for v in range(1, k + 1):
-    # Capacity Constraint
-    model.addConstr(gp.quicksum(Q[i] * x[v, i, j] for i in range(n) for j in range(n) if i != j) <= C,
-                    name=f"Vehicle_{v}_Capacity")
 
-    # All routes must start and finish at the same depot after servicing the customers
-    model.addConstr(gp.quicksum(x[v, 0, j] for j in range(1, n)) -
-                    gp.quicksum(x[v, j, 0] for j in range(1, n)) <= 1, name=f"Vehicle_{v}_Start_and_Finish_at_depot")
+FORMULATIONS = {'mtz': (build_mtz, print_mtz), 'two-index': (build_two_index, print_two_index)}
 
-# SubTour Elimination Constraints
-for i in range(1, n):
-    for j in range(1, n):
-        if i != j:
-            for v in range(1, k + 1):
-                model.addConstr(u[k, j] - u[k, i] + C * (1 - x[v, i, j]) >= Q[j])
 
-for i in range(1, n):
-    for v in range(1, k + 1):
-        model.addConstr(u[k, i] >= Q[i])
-        model.addConstr(u[k, i] <= C)
+def solve(formulation, n, k, Q, C, d, params=None, write=None, progress=None):
+    # Build and optimize one of the FORMULATIONS; params are Gurobi parameters (e.g. TimeLimit, Threads).
+    # progress is an optional pg.Progress, called along with the formulation's own callback.
+    # Seconds spent in each phase are left in model._timings
+    build, report = FORMULATIONS[formulation]
+    timings = dict()
+    start = time.perf_counter()
+    model, x = build(n, k, Q, C, d)
+    model.update()
+    timings['build'] = time.perf_counter() - start
+    for name, value in (params or {}).items():
+        model.setParam(name, value)
+    if write is not None:
+        start = time.perf_counter()
+        model.write(write)  # optional export (e.g. model.mps), text serialization is slow on big models
+        timings['write'] = time.perf_counter() - start
 
-# Optimize the model
-model.optimize()
+    callbacks = [cb for cb in (model._callback, progress) if cb is not None]
 
-# Print the solution
-if model.status == GRB.OPTIMAL:
-    print("Optimal solution found")
-    for v in range(1, k + 1):
-        print(f"Vehicle {v}:")
-        for i in range(n):
-            for j in range(n):
-                if i != j and x[v, i, j].x > 0.5:
-                    print(f"  Customer {i} to {j} ({d[i][j]} km)")
-    print(f"Total distance: {model.objVal:.2f} km")
-else:
-    print("No feasible solution found")
+    def callback(model, where):
+        for cb in callbacks:
+            cb(model, where)
+
+    start = time.perf_counter()
+    model.optimize(callback if callbacks else None)
+    timings['optimize'] = time.perf_counter() - start
+    if progress is not None:
+        progress.finish(model)
+    model._timings = timings
+    return model, x
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve a CVRP with Gurobi')
+    parser.add_argument('formulation', nargs='?', default='mtz', choices=FORMULATIONS)
+    parser.add_argument('instance', nargs='?', help='CVRPLIB .vrp file (default: the toy example above)')
+    parser.add_argument('--time-limit', type=float, help='seconds')
+    parser.add_argument('--threads', type=int)
+    parser.add_argument('--write', metavar='FILE', help='export the model, e.g. model.mps')
+    parser.add_argument('--progress', metavar='FILE', help='record the search over time, to .json or .csv')
+    args = parser.parse_args()
+
+    if args.instance is not None:
+        data = cvrplib.Instance(args.instance)
+        n, k, Q, C, d = data.n, data.k, data.Q, data.C, data.d
+
+    params = {}
+    if args.time_limit is not None:
+        params['TimeLimit'] = args.time_limit
+    if args.threads is not None:
+        params['Threads'] = args.threads
 
-model.write('model.mps')
+    progress = None if args.progress is None else pg.Progress()
+    model, x = solve(args.formulation, n, k, Q, C, d, params, args.write, progress)
+    FORMULATIONS[args.formulation][1](model, x, n, k, d)
+    if progress is not None:
+        if args.progress.endswith('.csv'):
+            progress.to_csv(args.progress)
+        else:
+            progress.to_json(args.progress, model._timings)
+        integral = progress.primal_integral()
+        summary = 'no incumbent' if integral is None else f'{integral:.4f}'
+        print(f'Primal integral: {summary}, time series written to {args.progress}')
@@ -458,110 +458,105 @@ COLUMNS
     vehicle_2_arc_5_4  c22       50
     vehicle_2_arc_5_4  c63       -100
     vehicle_1_node_0  OBJ       0
-    vehicle_1_node_1  OBJ       0
-    vehicle_1_node_2  OBJ       0
-    vehicle_1_node_3  OBJ       0
-    vehicle_1_node_4  OBJ       0
-    vehicle_1_node_5  OBJ       0
+    vehicle_1_node_1  c24       -1
+    vehicle_1_node_1  c26       -1
+    vehicle_1_node_1  c28       -1
+    vehicle_1_node_1  c30       -1
+    vehicle_1_node_1  c32       1
+    vehicle_1_node_1  c40       1
+    vehicle_1_node_1  c48       1
+    vehicle_1_node_1  c56       1
+    vehicle_1_node_1  c64       1
+    vehicle_1_node_1  c65       1
+    vehicle_1_node_2  c24       1
+    vehicle_1_node_2  c32       -1
+    vehicle_1_node_2  c34       -1
+    vehicle_1_node_2  c36       -1
+    vehicle_1_node_2  c38       -1
+    vehicle_1_node_2  c42       1
+    vehicle_1_node_2  c50       1
+    vehicle_1_node_2  c58       1
+    vehicle_1_node_2  c68       1
+    vehicle_1_node_2  c69       1
+    vehicle_1_node_3  c26       1
+    vehicle_1_node_3  c34       1
+    vehicle_1_node_3  c40       -1
+    vehicle_1_node_3  c42       -1
+    vehicle_1_node_3  c44       -1
+    vehicle_1_node_3  c46       -1
+    vehicle_1_node_3  c52       1
+    vehicle_1_node_3  c60       1
+    vehicle_1_node_3  c72       1
+    vehicle_1_node_3  c73       1
+    vehicle_1_node_4  c28       1
+    vehicle_1_node_4  c36       1
+    vehicle_1_node_4  c44       1
+    vehicle_1_node_4  c48       -1
+    vehicle_1_node_4  c50       -1
+    vehicle_1_node_4  c52       -1
+    vehicle_1_node_4  c54       -1
+    vehicle_1_node_4  c62       1
+    vehicle_1_node_4  c76       1
+    vehicle_1_node_4  c77       1
+    vehicle_1_node_5  c30       1
+    vehicle_1_node_5  c38       1
+    vehicle_1_node_5  c46       1
+    vehicle_1_node_5  c54       1
+    vehicle_1_node_5  c56       -1
+    vehicle_1_node_5  c58       -1
+    vehicle_1_node_5  c60       -1
+    vehicle_1_node_5  c62       -1
+    vehicle_1_node_5  c80       1
+    vehicle_1_node_5  c81       1
     vehicle_2_node_0  OBJ       0
-    vehicle_2_node_1  c24       -1
     vehicle_2_node_1  c25       -1
-    vehicle_2_node_1  c26       -1
     vehicle_2_node_1  c27       -1
-    vehicle_2_node_1  c28       -1
     vehicle_2_node_1  c29       -1
-    vehicle_2_node_1  c30       -1
     vehicle_2_node_1  c31       -1
-    vehicle_2_node_1  c32       1
     vehicle_2_node_1  c33       1
-    vehicle_2_node_1  c40       1
     vehicle_2_node_1  c41       1
-    vehicle_2_node_1  c48       1
     vehicle_2_node_1  c49       1
-    vehicle_2_node_1  c56       1
     vehicle_2_node_1  c57       1
-    vehicle_2_node_1  c64       1
-    vehicle_2_node_1  c65       1
     vehicle_2_node_1  c66       1
     vehicle_2_node_1  c67       1
-    vehicle_2_node_2  c24       1
     vehicle_2_node_2  c25       1
-    vehicle_2_node_2  c32       -1
     vehicle_2_node_2  c33       -1
-    vehicle_2_node_2  c34       -1
     vehicle_2_node_2  c35       -1
-    vehicle_2_node_2  c36       -1
     vehicle_2_node_2  c37       -1
-    vehicle_2_node_2  c38       -1
     vehicle_2_node_2  c39       -1
-    vehicle_2_node_2  c42       1
     vehicle_2_node_2  c43       1
-    vehicle_2_node_2  c50       1
     vehicle_2_node_2  c51       1
-    vehicle_2_node_2  c58       1
     vehicle_2_node_2  c59       1
-    vehicle_2_node_2  c68       1
-    vehicle_2_node_2  c69       1
     vehicle_2_node_2  c70       1
     vehicle_2_node_2  c71       1
-    vehicle_2_node_3  c26       1
     vehicle_2_node_3  c27       1
-    vehicle_2_node_3  c34       1
     vehicle_2_node_3  c35       1
-    vehicle_2_node_3  c40       -1
     vehicle_2_node_3  c41       -1
-    vehicle_2_node_3  c42       -1
     vehicle_2_node_3  c43       -1
-    vehicle_2_node_3  c44       -1
     vehicle_2_node_3  c45       -1
-    vehicle_2_node_3  c46       -1
     vehicle_2_node_3  c47       -1
-    vehicle_2_node_3  c52       1
     vehicle_2_node_3  c53       1
-    vehicle_2_node_3  c60       1
     vehicle_2_node_3  c61       1
-    vehicle_2_node_3  c72       1
-    vehicle_2_node_3  c73       1
     vehicle_2_node_3  c74       1
     vehicle_2_node_3  c75       1
-    vehicle_2_node_4  c28       1
     vehicle_2_node_4  c29       1
-    vehicle_2_node_4  c36       1
     vehicle_2_node_4  c37       1
-    vehicle_2_node_4  c44       1
     vehicle_2_node_4  c45       1
-    vehicle_2_node_4  c48       -1
     vehicle_2_node_4  c49       -1
-    vehicle_2_node_4  c50       -1
     vehicle_2_node_4  c51       -1
-    vehicle_2_node_4  c52       -1
     vehicle_2_node_4  c53       -1
-    vehicle_2_node_4  c54       -1
     vehicle_2_node_4  c55       -1
-    vehicle_2_node_4  c62       1
     vehicle_2_node_4  c63       1
-    vehicle_2_node_4  c76       1
-    vehicle_2_node_4  c77       1
     vehicle_2_node_4  c78       1
     vehicle_2_node_4  c79       1
-    vehicle_2_node_5  c30       1
     vehicle_2_node_5  c31       1
-    vehicle_2_node_5  c38       1
     vehicle_2_node_5  c39       1
-    vehicle_2_node_5  c46       1
     vehicle_2_node_5  c47       1
-    vehicle_2_node_5  c54       1
     vehicle_2_node_5  c55       1
-    vehicle_2_node_5  c56       -1
     vehicle_2_node_5  c57       -1
-    vehicle_2_node_5  c58       -1
     vehicle_2_node_5  c59       -1
-    vehicle_2_node_5  c60       -1
     vehicle_2_node_5  c61       -1
-    vehicle_2_node_5  c62       -1
     vehicle_2_node_5  c63       -1
-    vehicle_2_node_5  c80       1
-    vehicle_2_node_5  c81       1
     vehicle_2_node_5  c82       1
     vehicle_2_node_5  c83       1
     MARKER    'MARKER'                 'INTEND'